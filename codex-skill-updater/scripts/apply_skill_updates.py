@@ -4,41 +4,107 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import contextlib
 import csv
 import datetime as dt
+import errno
+import functools
 import hashlib
 import io
+import itertools
 import json
+import mmap
+import operator
 import os
 import re
 import shutil
+import stat
+import struct
 import subprocess
 import sys
+import tarfile
 import tempfile
+import threading
 import zipfile
-from concurrent.futures import ThreadPoolExecutor
-from dataclasses import dataclass, field
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, fields, is_dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator, TextIO
 
+from skill_update_common import JsonCache, run_script
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SCRIPT_DIR = Path(__file__).resolve().parent
 CODEX_HOME = Path(os.environ.get("CODEX_HOME", str(Path.home() / ".codex")))
 SKILLS_ROOT = CODEX_HOME / "skills"
+SYSTEM_SKILLS_ROOT = SKILLS_ROOT / ".system"
 DIST_ROOT = SKILLS_ROOT / "dist"
 BACKUPS_ROOT = CODEX_HOME / "backups"
-INSTALLER_SCRIPT = SKILLS_ROOT / ".system" / "skill-installer" / "scripts" / "install-skill-from-github.py"
+CACHE_ROOT = SKILLS_ROOT / ".cache"
+# Staging lives next to the installed skills so applying is a same-filesystem rename.
+STAGING_ROOT = SKILLS_ROOT / ".tmp"
+# Bare, shallow clones reused across rows and runs by --repo-cache.
+REPO_CACHE_ROOT = CACHE_ROOT / "repos"
+INSTALLER_SCRIPT = SYSTEM_SKILLS_ROOT / "skill-installer" / "scripts" / "install-skill-from-github.py"
 DEFAULT_JOBS = 4
+DEFAULT_EXECUTOR = "thread"
 MAX_JOBS = 8
 DEFAULT_CHECK_FORMAT = "auto"
 DEFAULT_BACKUP_KEEP_GENERATIONS = 2
+FAILED_STATUSES = frozenset({"FAILED", "FAILED_ROLLBACK"})
+GIT_LS_REMOTE_TIMEOUT = 20
+_ARCHIVE_PATH_RE = re.compile(r"(/\S+\.skill)")
+# Fixed part of a zip local file header (APPNOTE 4.3.7): signature .. extra field length.
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_FULL_SHA_RE = re.compile(r"[0-9a-f]{40}")
+# Files at least this large are hashed straight from a read-only mapping; smaller ones
+# fit in one read into the per-thread buffer, which is sized to match.
+FINGERPRINT_MMAP_THRESHOLD = 64 * 1024
+FINGERPRINT_JOBS = min(MAX_JOBS, os.cpu_count() or 1)
+ARCHIVE_COPY_BUFFER_SIZE = 1024 * 1024
+# Linux ioctl that shares file extents (btrfs, XFS, bcachefs); not exported by the fcntl module.
+FICLONE = 0x40049409
+
+# Destination tree signatures, keyed by _skill_dest path; dropped when a destination is replaced.
+_TREE_SIGNATURE_CACHE: dict[Path, list[tuple[str, str, int, int]]] = {}
+# Per-thread read buffer for _hash_file.
+_HASH_LOCAL = threading.local()
+# json.dumps() with keyword options builds a new encoder per call; streamed results share this one.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+# Installer stagings requested by more than one row, keyed by (repo, path, ref).
+_SHARED_STAGES: dict[tuple[str, str, str], SharedStage] = {}
+# Fixed _stage_one arguments for process-pool workers, set once by _init_stage_worker.
+_STAGE_WORKER_ARGS: dict[str, Any] = {}
+# Upstream commit per (repo, ref), resolved with git ls-remote; None when unknown.
+_REMOTE_REF_SHAS: dict[tuple[str, str], str | None] = {}
+_REPO_CACHE_LOCKS: dict[str, threading.Lock] = {}
+_REPO_CACHE_LOCKS_GUARD = threading.Lock()
+# Background deletions of replaced skill trees, joined before the run ends.
+_RETIRED_REMOVALS: list[threading.Thread] = []
+
+
+# Per-file digests of installed skills: path -> [mtime_ns, ctime_ns, size, ino, hexdigest].
+_FILE_DIGEST_CACHE = JsonCache(CACHE_ROOT / "fingerprints.json", keep=os.path.exists)
+# Whole-tree digests of installed skills: dest -> [stat key, tree hash].
+_TREE_DIGEST_CACHE = JsonCache(CACHE_ROOT / "tree_fingerprints.json", keep=os.path.exists)
+# Source last applied to each installed skill: dest -> {"source": id, "fingerprint": tree hash}.
+_APPLIED_SOURCE_CACHE = JsonCache(CACHE_ROOT / "applied_sources.json", keep=os.path.exists)
+# Caches a staging worker may fill; worker processes send their changes back with each result.
+_WORKER_CACHES = (_FILE_DIGEST_CACHE, _TREE_DIGEST_CACHE, _APPLIED_SOURCE_CACHE)
 
 
 def _default_source_map_paths() -> tuple[Path, Path]:
-    script_dir = Path(__file__).resolve().parent
-    config_dir = script_dir.parent / "config"
+    config_dir = SCRIPT_DIR.parent / "config"
     return config_dir / "skills_source_map.json", config_dir / "skills_source_map.local.json"
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateRow:
     skill: str
     bucket: str
@@ -49,7 +115,11 @@ class UpdateRow:
     note: str
 
 
-@dataclass
+# Check output columns, in UpdateRow field order.
+UPDATE_ROW_FIELDS = ("skill", "bucket", "result", "strategy", "repo", "remote_path", "note")
+
+
+@dataclass(slots=True)
 class UpdateResult:
     skill: str
     strategy: str
@@ -60,7 +130,7 @@ class UpdateResult:
     rollback: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class StageTaskResult:
     index: int
     row: UpdateRow
@@ -68,10 +138,30 @@ class StageTaskResult:
     result: UpdateResult | None = None
     temp_root: Path | None = None
     staged: Path | None = None
+    source_id: str | None = None
+    # Changes a process-pool worker made to _WORKER_CACHES, in the same order.
+    cache_changes: list[dict[str, Any]] | None = None
+
+
+@dataclass(slots=True)
+class SharedStage:
+    # One installer run shared by every row with the same (repo, path, ref).
+    refs: int
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    done: bool = False
+    temp_root: Path | None = None
+    staged: Path | None = None
+    error: str | None = None
 
 
-def _run(cmd: list[str]) -> subprocess.CompletedProcess[str]:
-    return subprocess.run(cmd, text=True, capture_output=True, check=False)
+# (temp_root, staged, error): staging helpers report failures as a message, not an exception.
+StageOutcome = tuple[Path | None, Path | None, str | None]
+
+
+def _run_installer(argv: list[str]) -> tuple[int, str]:
+    # Progress output (git clone chatter) is never reported, so a subprocess only keeps stderr.
+    code, out, err = run_script(INSTALLER_SCRIPT, argv, capture_stdout=False)
+    return code, (err or out).strip()
 
 
 def _normalize_row_value(value: Any) -> str:
@@ -92,20 +182,45 @@ def _to_update_row(raw: dict[str, Any]) -> UpdateRow:
     )
 
 
-def _load_rows_from_tsv_text(raw_text: str) -> list[UpdateRow]:
+def _row_selected(skill: str, strategy: str, strategies: set[str], skills: set[str]) -> bool:
+    if strategies and strategy not in strategies:
+        return False
+    if skills and skill not in skills:
+        return False
+    return True
+
+
+def _load_rows_from_tsv(lines: Iterable[str], strategies: set[str], skills: set[str]) -> tuple[list[UpdateRow], int]:
     rows: list[UpdateRow] = []
-    reader = csv.DictReader(io.StringIO(raw_text), delimiter="\t")
-    for row in reader:
-        parsed = _to_update_row(row)
-        if not parsed.skill or parsed.skill.startswith("summary:"):
+    total = 0
+    reader = csv.reader(lines, delimiter="\t")
+    header = next((cells for cells in reader if cells), None)
+    if header is None:
+        return rows, total
+    # Missing columns point one past the header, into the "" padding added to every row.
+    pad_idx = len(header)
+    positions = {name: idx for idx, name in enumerate(header)}
+    get_fields = operator.itemgetter(*(positions.get(name, pad_idx) for name in UPDATE_ROW_FIELDS))
+    skill_idx = positions.get("skill", pad_idx)
+    strategy_idx = positions.get("strategy", pad_idx)
+    for cells in reader:
+        if len(cells) <= pad_idx:
+            cells.extend([""] * (pad_idx + 1 - len(cells)))
+        skill = cells[skill_idx].strip()
+        if not skill or skill.startswith("summary:"):
             continue
-        rows.append(parsed)
-    return rows
+        total += 1
+        if not _row_selected(skill, cells[strategy_idx].strip(), strategies, skills):
+            continue
+        values = [value.strip() for value in get_fields(cells)]
+        rows.append(UpdateRow(*values))
+    return rows, total
 
 
-def _load_rows_from_ndjson_text(raw_text: str) -> list[UpdateRow]:
+def _load_rows_from_ndjson(lines: Iterable[str], strategies: set[str], skills: set[str]) -> tuple[list[UpdateRow], int]:
     rows: list[UpdateRow] = []
-    for line_no, raw_line in enumerate(raw_text.splitlines(), start=1):
+    total = 0
+    for line_no, raw_line in enumerate(lines, start=1):
         line = raw_line.strip()
         if not line:
             continue
@@ -120,29 +235,52 @@ def _load_rows_from_ndjson_text(raw_text: str) -> list[UpdateRow]:
             continue
         if line_type not in {"", "row"}:
             continue
-        parsed = _to_update_row(payload)
-        if not parsed.skill or parsed.skill.startswith("summary:"):
+        skill = _normalize_row_value(payload.get("skill", ""))
+        if not skill or skill.startswith("summary:"):
+            continue
+        total += 1
+        if not _row_selected(skill, _normalize_row_value(payload.get("strategy", "")), strategies, skills):
             continue
-        rows.append(parsed)
-    return rows
+        rows.append(_to_update_row(payload))
+    return rows, total
 
 
-def _detect_check_format(raw_text: str) -> str:
-    for raw_line in raw_text.splitlines():
+def _detect_check_format(fp: TextIO) -> tuple[str, Iterable[str]]:
+    # Peeks up to the first non-blank line; the returned iterable replays it before the rest of fp.
+    consumed: list[str] = []
+    for raw_line in fp:
+        consumed.append(raw_line)
         line = raw_line.strip()
         if not line:
             continue
-        if line.startswith("{"):
-            return "ndjson"
-        return "tsv"
-    return "tsv"
+        return ("ndjson" if line.startswith("{") else "tsv"), itertools.chain(consumed, fp)
+    return "tsv", consumed
+
+
+def _load_rows(
+    fp: TextIO,
+    check_format: str,
+    strategies: set[str],
+    skills: set[str],
+) -> tuple[list[UpdateRow], int]:
+    # Returns the rows matching the --strategy/--skill filters plus the total row count.
+    lines: Iterable[str] = fp
+    resolved_format = check_format
+    if check_format == "auto":
+        resolved_format, lines = _detect_check_format(fp)
+    if resolved_format == "ndjson":
+        return _load_rows_from_ndjson(lines, strategies, skills)
+    return _load_rows_from_tsv(lines, strategies, skills)
 
 
-def _load_rows(raw_text: str, check_format: str) -> list[UpdateRow]:
-    resolved_format = _detect_check_format(raw_text) if check_format == "auto" else check_format
-    if resolved_format == "ndjson":
-        return _load_rows_from_ndjson_text(raw_text)
-    return _load_rows_from_tsv_text(raw_text)
+def _load_rows_from_path(
+    path: Path,
+    check_format: str,
+    strategies: set[str],
+    skills: set[str],
+) -> tuple[list[UpdateRow], int]:
+    with path.open("r", encoding="utf-8", newline="") as fp:
+        return _load_rows(fp, check_format, strategies, skills)
 
 
 def _load_source_map(path: Path) -> dict[str, dict[str, str]]:
@@ -170,67 +308,333 @@ def _load_merged_source_map(public_path: Path, local_path: Path) -> dict[str, di
     return merged
 
 
-def _copy_tree(src: Path, dst: Path) -> None:
-    if dst.exists() or dst.is_symlink():
-        if dst.is_symlink() or dst.is_file():
-            dst.unlink()
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+
+def _fast_copy(src: str, dst: str) -> str:
+    if not hasattr(os, "copy_file_range"):
+        return shutil.copy2(src, dst)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        if _reflink(fsrc.fileno(), fdst.fileno()):
+            remaining = 0
         else:
-            shutil.rmtree(dst)
-    shutil.copytree(src, dst)
+            remaining = os.fstat(fsrc.fileno()).st_size
+        try:
+            # Kernel-side copy: no user-space buffers, and server-side or in-fs copies where supported.
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+    shutil.copystat(src, dst)
+    return dst
+
+
+def _link_or_copy(src: str, dst: str) -> str:
+    # Backups are never modified in place, so sharing inodes with the live tree is safe.
+    try:
+        os.link(src, dst)
+    except OSError:
+        return _fast_copy(src, dst)
+    return dst
+
+
+@functools.lru_cache(maxsize=None)
+def _io_executor() -> ThreadPoolExecutor:
+    # One pool for per-file hashing and copying; stage workers share it instead of each spinning up their own.
+    return ThreadPoolExecutor(max_workers=FINGERPRINT_JOBS, thread_name_prefix="skill-io")
+
+
+def _remove_path(path: Path) -> bool:
+    # One lstat decides between unlink and rmtree; returns False if nothing was there.
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return False
+    if stat.S_ISDIR(mode):
+        shutil.rmtree(path)
+    else:
+        os.unlink(path)
+    return True
+
+
+def _copy_tree(src: Path, dst: Path, copy_function: Callable[[str, str], object] = _fast_copy) -> None:
+    _remove_path(dst)
+    entries = _walk_tree(src)
+    dst.mkdir(parents=True)
+    dirs = [(entry.path, dst / rel) for rel, kind, entry in entries if kind == "D"]
+    for _, target in dirs:
+        target.mkdir()
+    files: list[tuple[str, Path]] = []
+    for rel, kind, entry in entries:
+        if kind == "F" or (kind == "L" and not entry.is_dir()):
+            files.append((entry.path, dst / rel))
+        elif kind == "L":
+            # Same as copytree(symlinks=False): linked directories are copied as real trees.
+            shutil.copytree(entry.path, dst / rel, copy_function=copy_function)
+    # Directories exist up front, so file copies are independent and can overlap their IO.
+    if len(files) > 1:
+        list(_io_executor().map(lambda item: copy_function(item[0], str(item[1])), files))
+    else:
+        for source, target in files:
+            copy_function(source, str(target))
+    for source, target in reversed(dirs):
+        shutil.copystat(source, target)
+    shutil.copystat(src, dst)
 
 
-def _fingerprint_tree(root: Path) -> str:
+def _iter_tree(root: Path) -> Iterator[tuple[str, str, os.DirEntry[str]]]:
+    # (rel, kind, entry) in sorted-path order; DirEntry type checks come from readdir, not extra stats.
+    # An explicit stack of per-directory iterators keeps pre-order without recursion.
     if not root.is_dir():
         raise RuntimeError(f"not a directory: {root}")
-    digest = hashlib.sha256()
-    for path in sorted(root.rglob("*")):
-        rel = path.relative_to(root).as_posix().encode("utf-8")
-        if path.is_symlink():
-            digest.update(b"L")
-            digest.update(rel)
-            digest.update(b"\0")
-            digest.update(os.readlink(path).encode("utf-8", errors="replace"))
-            digest.update(b"\0")
+    stack: list[tuple[Iterator[os.DirEntry[str]], str]] = [(_sorted_dir_entries(str(root)), "")]
+    while stack:
+        children, prefix = stack[-1]
+        entry = next(children, None)
+        if entry is None:
+            stack.pop()
             continue
-        if path.is_dir():
-            digest.update(b"D")
-            digest.update(rel)
-            digest.update(b"\0")
-            continue
-        if path.is_file():
-            digest.update(b"F")
-            digest.update(rel)
+        rel = prefix + entry.name
+        if entry.is_symlink():
+            yield rel, "L", entry
+        elif entry.is_dir(follow_symlinks=False):
+            yield rel, "D", entry
+            stack.append((_sorted_dir_entries(entry.path), rel + "/"))
+        elif entry.is_file(follow_symlinks=False):
+            yield rel, "F", entry
+
+
+def _sorted_dir_entries(directory: str) -> Iterator[os.DirEntry[str]]:
+    with os.scandir(directory) as it:
+        return iter(sorted(it, key=lambda e: e.name))
+
+
+def _walk_tree(root: Path) -> list[tuple[str, str, os.DirEntry[str]]]:
+    return list(_iter_tree(root))
+
+
+def _tree_signature(root: Path) -> list[tuple[str, str, int, int]]:
+    signature: list[tuple[str, str, int, int]] = []
+    for rel, kind, entry in _iter_tree(root):
+        if kind == "F":
+            st = entry.stat(follow_symlinks=False)
+            signature.append((rel, kind, st.st_size, st.st_mode & 0o111))
+        else:
+            signature.append((rel, kind, 0, 0))
+    return signature
+
+
+def _cached_tree_signature(root: Path) -> list[tuple[str, str, int, int]]:
+    cached = _TREE_SIGNATURE_CACHE.get(root)
+    if cached is None:
+        cached = _tree_signature(root)
+        _TREE_SIGNATURE_CACHE[root] = cached
+    return cached
+
+
+def _hash_buffer() -> tuple[bytearray, memoryview]:
+    if not hasattr(_HASH_LOCAL, "buf"):
+        _HASH_LOCAL.buf = bytearray(FINGERPRINT_MMAP_THRESHOLD)
+        _HASH_LOCAL.view = memoryview(_HASH_LOCAL.buf)
+    return _HASH_LOCAL.buf, _HASH_LOCAL.view
+
+
+def _hash_file(path: str) -> bytes:
+    buf, view = _hash_buffer()
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb", buffering=0) as fp:
+        if os.fstat(fp.fileno()).st_size >= FINGERPRINT_MMAP_THRESHOLD:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                digest.update(mapped)
+            return digest.digest()
+        while n := fp.readinto(buf):
+            digest.update(view[:n])
+    return digest.digest()
+
+
+def _hash_file_cached(path: str) -> bytes:
+    # Same stat fields as _tree_stat_key: an in-place edit with a restored mtime still moves ctime.
+    st = os.stat(path)
+    stat_key = [st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino]
+    cached = _FILE_DIGEST_CACHE.get(path)
+    if isinstance(cached, list) and len(cached) == 5 and cached[:4] == stat_key:
+        return bytes.fromhex(cached[4])
+    file_digest = _hash_file(path)
+    _FILE_DIGEST_CACHE.set(path, [*stat_key, file_digest.hex()])
+    return file_digest
+
+
+def _tree_stat_key(entries: list[tuple[str, str, os.DirEntry[str]]]) -> str:
+    # ctime is included because copy tools can restore mtime but nothing can set ctime.
+    digest = hashlib.blake2b(digest_size=16)
+    for rel, kind, entry in entries:
+        st = entry.stat(follow_symlinks=False)
+        digest.update(f"{kind}{rel}\0{st.st_mtime_ns}:{st.st_ctime_ns}:{st.st_size}:{st.st_mode:o}:{st.st_ino}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _tree_content_hash(root: Path, use_cache: bool = False) -> str:
+    entries = _walk_tree(root)
+    if use_cache:
+        cache_key = str(root)
+        stat_key = _tree_stat_key(entries)
+        cached = _TREE_DIGEST_CACHE.get(cache_key)
+        if cached and cached[0] == stat_key:
+            return cached[1]
+        tree_digest = _hash_tree_entries(entries, _hash_file_cached)
+        _TREE_DIGEST_CACHE.set(cache_key, [stat_key, tree_digest])
+        return tree_digest
+    return _hash_tree_entries(entries, _hash_file)
+
+
+def _hash_tree_entries(entries: list[tuple[str, str, os.DirEntry[str]]], hash_file: Callable[[str], bytes]) -> str:
+    files = [entry.path for _, kind, entry in entries if kind == "F"]
+    if len(files) > 1:
+        # hashlib releases the GIL while hashing, so threads overlap both IO and CPU.
+        file_digests = dict(zip(files, _io_executor().map(hash_file, files)))
+    else:
+        file_digests = {path: hash_file(path) for path in files}
+
+    # Change detection only; BLAKE2b is stdlib and faster than SHA-256 on 64-bit CPUs.
+    digest = hashlib.blake2b()
+    for rel, kind, entry in entries:
+        digest.update(kind.encode("ascii"))
+        digest.update(rel.encode("utf-8"))
+        digest.update(b"\0")
+        if kind == "L":
+            digest.update(os.readlink(entry.path).encode("utf-8", errors="replace"))
             digest.update(b"\0")
-            exec_bits = path.stat(follow_symlinks=False).st_mode & 0o111
+        elif kind == "F":
+            exec_bits = entry.stat(follow_symlinks=False).st_mode & 0o111
             digest.update(f"X{exec_bits:o}".encode("ascii"))
             digest.update(b"\0")
-            with path.open("rb") as fp:
-                for chunk in iter(lambda: fp.read(1024 * 1024), b""):
-                    digest.update(chunk)
+            digest.update(file_digests[entry.path])
             digest.update(b"\0")
     return digest.hexdigest()
 
 
+def _trees_equal(staged: Path, dest: Path) -> bool:
+    # staged is a fresh temp dir per row; only dest is worth caching within a run.
+    if _tree_signature(staged) != _cached_tree_signature(dest):
+        return False
+    # SKILL.md is what upstream edits most often; one file hash settles those without a full pass.
+    staged_md, dest_md = staged / "SKILL.md", dest / "SKILL.md"
+    if staged_md.is_file() and dest_md.is_file() and _hash_file(str(staged_md)) != _hash_file_cached(str(dest_md)):
+        return False
+    return _tree_content_hash(staged) == _tree_content_hash(dest, use_cache=True)
+
+
 def _self_skill_name() -> str | None:
-    scripts_dir = Path(__file__).resolve().parent
-    if scripts_dir.name != "scripts":
+    if SCRIPT_DIR.name != "scripts":
         return None
-    name = scripts_dir.parent.name.strip()
+    name = SCRIPT_DIR.parent.name.strip()
     return name or None
 
 
 def _read_archive_path_from_note(note: str) -> Path | None:
-    match = re.search(r"(/[^\s]+\.skill)", note)
+    match = _ARCHIVE_PATH_RE.search(note)
     if match:
         return Path(match.group(1))
     return None
 
 
-def _stage_from_installer(skill: str, repo: str, skill_path: str, ref: str, commands: list[str]) -> tuple[Path, Path]:
-    tmp_root = Path(tempfile.mkdtemp(prefix=f"skill-stage-{skill}-"))
-    cmd = [
-        "python3",
-        str(INSTALLER_SCRIPT),
+def _make_stage_root(skill: str) -> Path:
+    STAGING_ROOT.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix=f"skill-stage-{skill}-", dir=str(STAGING_ROOT)))
+
+
+def _stage_from_installer(
+    skill: str, repo: str, skill_path: str, ref: str, commands: list[str], repo_cache: bool = False
+) -> StageOutcome:
+    shared = _SHARED_STAGES.get((repo, skill_path, ref))
+    if shared is None:
+        return _run_installer_stage(skill, repo, skill_path, ref, commands, repo_cache)
+    with shared.lock:
+        if not shared.done:
+            shared.temp_root, shared.staged, shared.error = _run_installer_stage(
+                skill, repo, skill_path, ref, commands, repo_cache
+            )
+            shared.done = True
+        else:
+            commands.append(f"reuse staged {repo}:{skill_path}@{ref}")
+        shared.refs -= 1
+        if shared.error is not None or shared.staged is None:
+            return None, None, shared.error or "staging failed"
+        if shared.refs == 0:
+            # Last consumer takes over the shared tree instead of copying it.
+            tmp_root, staged = shared.temp_root, shared.staged
+            shared.temp_root = shared.staged = None
+            if staged.name != skill:
+                staged = staged.rename(tmp_root / skill)
+            return tmp_root, staged, None
+        tmp_root = _make_stage_root(skill)
+        try:
+            _copy_tree(shared.staged, tmp_root / skill)
+        except OSError as exc:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+            return None, None, f"failed to copy shared staging ({exc})"
+        return tmp_root, tmp_root / skill, None
+
+
+def _installer_stage_key(
+    row: UpdateRow, allow_manual_map: bool, source_map: dict[str, dict[str, str]]
+) -> tuple[str, str, str] | None:
+    # Mirrors the installer branches of _stage_one.
+    if row.strategy == "update-via-github":
+        if row.repo in {"", "-"} or row.remote_path in {"", "-"}:
+            return None
+        return row.repo, row.remote_path, "main"
+    if row.strategy in {"manual-source-map-required", "manual-system-source-map"} and allow_manual_map:
+        cfg = source_map.get(row.skill)
+        if cfg:
+            return cfg["repo"], cfg["path"], cfg.get("ref", "main")
+    return None
+
+
+def _plan_shared_stages(
+    stage_inputs: list[tuple[int, UpdateRow]], allow_manual_map: bool, source_map: dict[str, dict[str, str]]
+) -> None:
+    counts: dict[tuple[str, str, str], int] = {}
+    for _, row in stage_inputs:
+        key = _installer_stage_key(row, allow_manual_map, source_map)
+        if key is not None:
+            counts[key] = counts.get(key, 0) + 1
+    _SHARED_STAGES.clear()
+    _SHARED_STAGES.update({key: SharedStage(refs=n) for key, n in counts.items() if n > 1})
+
+
+def _release_shared_stages() -> None:
+    # Consumers skipped by fail-fast never take their reference; drop what is left.
+    for shared in _SHARED_STAGES.values():
+        if shared.temp_root is not None:
+            shutil.rmtree(shared.temp_root, ignore_errors=True)
+    _SHARED_STAGES.clear()
+
+
+def _run_installer_stage(
+    skill: str, repo: str, skill_path: str, ref: str, commands: list[str], repo_cache: bool = False
+) -> StageOutcome:
+    if repo_cache:
+        outcome = _stage_from_repo_cache(skill, repo, skill_path, ref, commands)
+        if outcome is not None:
+            return outcome
+    tmp_root = _make_stage_root(skill)
+    argv = [
         "--repo",
         repo,
         "--path",
@@ -242,30 +646,290 @@ def _stage_from_installer(skill: str, repo: str, skill_path: str, ref: str, comm
         "--dest",
         str(tmp_root),
     ]
-    commands.append(" ".join(cmd))
-    proc = _run(cmd)
-    if proc.returncode != 0:
-        msg = (proc.stderr or proc.stdout).strip()
+    commands.append(" ".join(["python3", str(INSTALLER_SCRIPT), *argv]))
+    returncode, msg = _run_installer(argv)
+    if returncode != 0:
         shutil.rmtree(tmp_root, ignore_errors=True)
-        raise RuntimeError(msg or "install-skill-from-github failed")
+        return None, None, msg or "install-skill-from-github failed"
     staged = tmp_root / skill
     if not (staged / "SKILL.md").is_file():
         shutil.rmtree(tmp_root, ignore_errors=True)
-        raise RuntimeError("staged skill is invalid (missing SKILL.md)")
-    return tmp_root, staged
+        return None, None, "staged skill is invalid (missing SKILL.md)"
+    return tmp_root, staged, None
 
 
-def _stage_from_archive(skill: str, note: str) -> tuple[Path, Path]:
-    archive = _read_archive_path_from_note(note) or (DIST_ROOT / f"{skill}.skill")
-    if not archive.is_file():
-        raise RuntimeError(f"archive not found: {archive}")
-    tmp_root = Path(tempfile.mkdtemp(prefix=f"skill-stage-{skill}-"))
+def _ls_remote_urls(repo: str) -> tuple[str, str]:
+    return f"https://github.com/{repo}.git", f"git@github.com:{repo}.git"
+
+
+def _ls_remote_env() -> dict[str, str]:
+    return {**os.environ, "GIT_TERMINAL_PROMPT": "0", "GIT_SSH_COMMAND": "ssh -o BatchMode=yes"}
+
+
+def _pick_ref_sha(ls_remote_output: str, ref: str) -> str | None:
+    refs = dict(reversed(line.split("\t", 1)) for line in ls_remote_output.splitlines() if "\t" in line)
+    # Branches win over tags; annotated tags resolve to the commit they point at.
+    for name in (f"refs/heads/{ref}", f"refs/tags/{ref}^{{}}", f"refs/tags/{ref}"):
+        if name in refs:
+            return refs[name]
+    return None
+
+
+def _remote_ref_sha(repo: str, ref: str) -> str | None:
+    # None means "unknown" (no git, offline, private repo without credentials); callers then stage as usual.
+    if _FULL_SHA_RE.fullmatch(ref):
+        return ref
+    key = (repo, ref)
+    if key in _REMOTE_REF_SHAS:
+        return _REMOTE_REF_SHAS[key]
+    sha = None
+    if shutil.which("git") is not None:
+        for url in _ls_remote_urls(repo):
+            try:
+                proc = subprocess.run(
+                    ["git", "ls-remote", url, ref],
+                    text=True,
+                    capture_output=True,
+                    check=False,
+                    env=_ls_remote_env(),
+                    timeout=GIT_LS_REMOTE_TIMEOUT,
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                continue
+            if proc.returncode == 0:
+                sha = _pick_ref_sha(proc.stdout, ref)
+                break
+    _REMOTE_REF_SHAS[key] = sha
+    return sha
+
+
+async def _ls_remote_async(repo: str, ref: str, limit: asyncio.Semaphore) -> str | None:
+    async with limit:
+        for url in _ls_remote_urls(repo):
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    "git",
+                    "ls-remote",
+                    url,
+                    ref,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL,
+                    env=_ls_remote_env(),
+                )
+            except OSError:
+                continue
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), GIT_LS_REMOTE_TIMEOUT)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                continue
+            if proc.returncode == 0:
+                return _pick_ref_sha(stdout.decode("utf-8", errors="replace"), ref)
+        return None
+
+
+async def _gather_remote_refs(keys: list[tuple[str, str]]) -> dict[tuple[str, str], str | None]:
+    limit = asyncio.Semaphore(MAX_JOBS)
+    shas = await asyncio.gather(*(_ls_remote_async(repo, ref, limit) for repo, ref in keys))
+    return dict(zip(keys, shas))
+
+
+def _prefetch_remote_refs(
+    stage_inputs: list[tuple[int, UpdateRow]], allow_manual_map: bool, source_map: dict[str, dict[str, str]]
+) -> None:
+    # Resolve every distinct (repo, ref) up front from one event loop instead of one blocking
+    # ls-remote per stage worker; anything left unresolved is looked up lazily as before.
+    keys: set[tuple[str, str]] = set()
+    for _, row in stage_inputs:
+        key = _installer_stage_key(row, allow_manual_map, source_map)
+        if key is not None and not _FULL_SHA_RE.fullmatch(key[2]):
+            keys.add((key[0], key[2]))
+    pending = sorted(keys - _REMOTE_REF_SHAS.keys())
+    if not pending or shutil.which("git") is None:
+        return
+    try:
+        _REMOTE_REF_SHAS.update(asyncio.run(_gather_remote_refs(pending)))
+    except (OSError, RuntimeError):
+        return
+
+
+def _github_source_id(repo: str, skill_path: str, ref: str) -> str | None:
+    sha = _remote_ref_sha(repo, ref)
+    if sha is None:
+        return None
+    return f"github:{repo}@{sha}:{skill_path.strip('/')}"
+
+
+def _git(args: list[str], git_dir: Path | None = None) -> subprocess.CompletedProcess[str]:
+    cmd = ["git", *(["--git-dir", str(git_dir)] if git_dir else []), *args]
+    return subprocess.run(cmd, text=True, capture_output=True, check=False, env=_ls_remote_env())
+
+
+@contextlib.contextmanager
+def _repo_cache_lock(cache_dir: Path) -> Iterator[None]:
+    # Threads of this run share a lock per repo; flock also serializes other runs and process workers.
+    with _REPO_CACHE_LOCKS_GUARD:
+        lock = _REPO_CACHE_LOCKS.setdefault(str(cache_dir), threading.Lock())
+    with lock:
+        if fcntl is None:
+            yield
+            return
+        REPO_CACHE_ROOT.mkdir(parents=True, exist_ok=True)
+        with open(f"{cache_dir}.lock", "w") as lock_fp:
+            fcntl.flock(lock_fp, fcntl.LOCK_EX)
+            yield
+
+
+def _ensure_repo_commit(repo: str, ref: str) -> tuple[Path, str] | None:
+    # Returns the bare cache and the commit for ref, fetching it (shallow) only when missing.
+    cache_dir = REPO_CACHE_ROOT / f"{repo.replace('/', '__')}.git"
+    sha = _remote_ref_sha(repo, ref)
+    with _repo_cache_lock(cache_dir):
+        if not cache_dir.is_dir() and _git(["init", "--bare", "--quiet", str(cache_dir)]).returncode != 0:
+            return None
+        if sha and _git(["cat-file", "-e", f"{sha}^{{commit}}"], git_dir=cache_dir).returncode == 0:
+            return cache_dir, sha
+        for url in _ls_remote_urls(repo):
+            if _git(["fetch", "--quiet", "--depth", "1", url, ref], git_dir=cache_dir).returncode != 0:
+                continue
+            head = _git(["rev-parse", "FETCH_HEAD"], git_dir=cache_dir)
+            if head.returncode == 0:
+                return cache_dir, head.stdout.strip()
+    return None
+
+
+def _stage_from_repo_cache(
+    skill: str, repo: str, skill_path: str, ref: str, commands: list[str]
+) -> StageOutcome | None:
+    # None means "use the installer instead" (no git, fetch failed, path missing at that commit).
+    if shutil.which("git") is None:
+        return None
+    located = _ensure_repo_commit(repo, ref)
+    if located is None:
+        return None
+    cache_dir, sha = located
+    path = skill_path.strip("/")
+    tmp_root = _make_stage_root(skill)
+    export_root = tmp_root / ".export"
+    cmd = ["git", "--git-dir", str(cache_dir), "archive", "--format=tar", sha, "--", path]
+    try:
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+            with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+                _extract_tar(tar, export_root)
+        exported = export_root.joinpath(*path.split("/"))
+        if proc.returncode != 0 or not (exported / "SKILL.md").is_file():
+            raise RuntimeError(f"git archive produced no skill at {path}")
+        staged = exported.rename(tmp_root / skill)
+    except (OSError, RuntimeError, tarfile.TarError):
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        return None
+    shutil.rmtree(export_root, ignore_errors=True)
+    commands.append(" ".join(cmd))
+    return tmp_root, staged, None
+
+
+def _archive_path_for(skill: str, note: str) -> Path:
+    return _read_archive_path_from_note(note) or (DIST_ROOT / f"{skill}.skill")
+
+
+def _archive_source_id(archive: Path) -> str | None:
+    # Identity from stat data plus the central directory CRCs; no member is decompressed.
     try:
+        st = archive.stat()
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{archive}\0{st.st_mtime_ns}\0{st.st_size}\0".encode("utf-8"))
         with zipfile.ZipFile(archive, "r") as zf:
-            zf.extractall(tmp_root)
+            for info in zf.infolist():
+                digest.update(f"{info.filename}\0{info.CRC}\0".encode("utf-8"))
+    except (OSError, zipfile.BadZipFile):
+        return None
+    return f"archive:{digest.hexdigest()}"
+
+
+def _dest_matches_source(dest: Path, source_id: str) -> bool:
+    recorded = _APPLIED_SOURCE_CACHE.get(str(dest))
+    if not recorded or recorded.get("source") != source_id or not dest.is_dir():
+        return False
+    return _tree_content_hash(dest, use_cache=True) == recorded.get("fingerprint")
+
+
+def _record_applied_source(dest: Path, source_id: str) -> None:
+    try:
+        fingerprint = _tree_content_hash(dest, use_cache=True)
+    except (OSError, RuntimeError):
+        return
+    _APPLIED_SOURCE_CACHE.set(str(dest), {"source": source_id, "fingerprint": fingerprint})
+
+
+def _archive_member_target(root: Path, name: str) -> Path:
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in {"", "."}]
+    if not parts or ".." in parts:
+        raise RuntimeError(f"unsafe archive member: {name}")
+    return root.joinpath(*parts)
+
+
+def _copy_stored_member(raw: io.BufferedReader, info: zipfile.ZipInfo, target: Path, view: memoryview) -> None:
+    raw.seek(info.header_offset)
+    header = _ZIP_LOCAL_HEADER.unpack(raw.read(_ZIP_LOCAL_HEADER.size))
+    if header[0] != b"PK\x03\x04":
+        raise RuntimeError(f"bad local header for archive member: {info.filename}")
+    offset = info.header_offset + _ZIP_LOCAL_HEADER.size + header[9] + header[10]
+    remaining = info.file_size
+    with target.open("wb") as dst:
+        while remaining > 0:
+            copied = os.copy_file_range(raw.fileno(), dst.fileno(), remaining, offset)
+            if copied == 0:
+                raise RuntimeError(f"truncated archive member: {info.filename}")
+            offset += copied
+            remaining -= copied
+    # The kernel copy bypasses zipfile's CRC check; read the copy back (still in the page cache) instead.
+    crc = 0
+    with target.open("rb") as src:
+        while n := src.readinto(view):
+            crc = zlib.crc32(view[:n], crc)
+    if crc != info.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for file {info.filename!r}")
+
+
+def _copy_zip_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, target: Path, view: memoryview) -> None:
+    with zf.open(info) as src, target.open("wb") as dst:
+        while n := src.readinto(view):
+            dst.write(view[:n])
+
+
+def _extract_archive(archive: Path, dest_root: Path) -> None:
+    # Stored members are copied straight out of the archive file by the kernel;
+    # compressed or encrypted members are streamed through one reused buffer.
+    fast_copy = hasattr(os, "copy_file_range")
+    with zipfile.ZipFile(archive, "r") as zf, archive.open("rb") as raw:
+        members = [(info, _archive_member_target(dest_root, info.filename)) for info in zf.infolist()]
+        # Create every directory once up front, shallowest first, instead of per member.
+        directories = {target if info.is_dir() else target.parent for info, target in members}
+        for directory in sorted(directories, key=lambda d: len(d.parts)):
+            directory.mkdir(parents=True, exist_ok=True)
+        view = memoryview(bytearray(ARCHIVE_COPY_BUFFER_SIZE))
+        for info, target in members:
+            if info.is_dir():
+                continue
+            if fast_copy and info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+                try:
+                    _copy_stored_member(raw, info, target, view)
+                    continue
+                except OSError:
+                    pass
+            _copy_zip_member(zf, info, target, view)
+
+
+def _stage_from_archive(skill: str, archive: Path) -> StageOutcome:
+    if not archive.is_file():
+        return None, None, f"archive not found: {archive}"
+    tmp_root = _make_stage_root(skill)
+    try:
+        _extract_archive(archive, tmp_root)
     except Exception as exc:
         shutil.rmtree(tmp_root, ignore_errors=True)
-        raise RuntimeError(f"failed to extract archive: {archive} ({exc})") from exc
+        return None, None, f"failed to extract archive: {archive} ({exc})"
 
     staged = tmp_root / skill
     if not (staged / "SKILL.md").is_file():
@@ -275,21 +939,24 @@ def _stage_from_archive(skill: str, note: str) -> tuple[Path, Path]:
             staged = candidates[0]
         else:
             shutil.rmtree(tmp_root, ignore_errors=True)
-            raise RuntimeError("archive layout is ambiguous (SKILL.md not uniquely resolvable)")
-    return tmp_root, staged
+            return None, None, "archive layout is ambiguous (SKILL.md not uniquely resolvable)"
+    return tmp_root, staged, None
 
 
 def _target_root(bucket: str) -> Path:
-    return SKILLS_ROOT / ".system" if bucket == "system" else SKILLS_ROOT
+    return SYSTEM_SKILLS_ROOT if bucket == "system" else SKILLS_ROOT
+
+
+@functools.lru_cache(maxsize=None)
+def _skill_dest(bucket: str, skill: str) -> Path:
+    return _target_root(bucket) / skill
 
 
 def _default_backup_root(ts: str) -> Path:
     return BACKUPS_ROOT / ts
 
 
-def _is_subpath(path: Path, parent: Path) -> bool:
-    path_resolved = path.resolve()
-    parent_resolved = parent.resolve()
+def _is_subpath(path_resolved: Path, parent_resolved: Path) -> bool:
     try:
         path_resolved.relative_to(parent_resolved)
         return True
@@ -297,10 +964,22 @@ def _is_subpath(path: Path, parent: Path) -> bool:
         return False
 
 
-def _validate_backup_location(dest: Path, candidate: Path, label: str) -> None:
-    if _is_subpath(candidate, dest):
+@functools.lru_cache(maxsize=None)
+def _resolved_backup_root(backup_root: Path) -> Path:
+    return backup_root.resolve()
+
+
+@functools.lru_cache(maxsize=None)
+def _prepare_backup_root(backup_root: Path) -> None:
+    # Created once, on the first real backup: an empty generation directory from a no-op run
+    # would count toward DEFAULT_BACKUP_KEEP_GENERATIONS and evict a real one.
+    backup_root.mkdir(parents=True, exist_ok=True)
+
+
+def _validate_backup_location(dest_resolved: Path, candidate_resolved: Path, label: str) -> None:
+    if _is_subpath(candidate_resolved, dest_resolved):
         raise RuntimeError(
-            f"unsafe {label}: {candidate} is inside update target {dest}"
+            f"unsafe {label}: {candidate_resolved} is inside update target {dest_resolved}"
         )
 
 
@@ -313,40 +992,95 @@ def _prune_backup_generations(backups_root: Path, keep: int = DEFAULT_BACKUP_KEE
 
 
 def _create_backup(skill: str, bucket: str, backup_root: Path, no_backup: bool) -> tuple[Path | None, bool]:
-    dest = _target_root(bucket) / skill
-    _validate_backup_location(dest, backup_root, "backup_root")
-    if no_backup or not dest.exists():
-        return None, dest.exists()
-    backup_root.mkdir(parents=True, exist_ok=True)
+    dest = _skill_dest(bucket, skill)
+    # Resolve dest once per row; the backup root is resolved once per run.
+    dest_resolved = dest.resolve()
+    backup_root_resolved = _resolved_backup_root(backup_root)
+    _validate_backup_location(dest_resolved, backup_root_resolved, "backup_root")
+    had_dest = dest.exists()
+    if no_backup or not had_dest:
+        return None, had_dest
+    _prepare_backup_root(backup_root)
     backup_rel = f"{bucket}__{skill}"
+    if os.stat(backup_root).st_dev != os.stat(dest_resolved).st_dev:
+        # Hardlinks cannot cross filesystems; one tar file beats a mirror tree of full copies.
+        backup_rel += ".tar"
     backup_path = backup_root / backup_rel
-    _validate_backup_location(dest, backup_path, "backup_path")
-    _copy_tree(dest, backup_path)
+    _validate_backup_location(dest_resolved, backup_root_resolved / backup_rel, "backup_path")
+    if backup_path.suffix == ".tar":
+        # dereference matches _copy_tree, which also copies what symlinks point at.
+        with tarfile.open(backup_path, "w", dereference=True) as tar:
+            tar.add(str(dest), arcname=dest.name)
+    else:
+        _copy_tree(dest, backup_path, copy_function=_link_or_copy)
     return backup_path, True
 
 
+def _retire_dest(skill: str, dest: Path) -> Path | None:
+    # Move the installed tree into the staging root so the new one can be renamed in right after.
+    if not os.path.lexists(dest):
+        return None
+    STAGING_ROOT.mkdir(parents=True, exist_ok=True)
+    retired_root = Path(tempfile.mkdtemp(prefix=f"skill-retired-{skill}-", dir=str(STAGING_ROOT)))
+    try:
+        os.rename(dest, retired_root / skill)
+    except OSError:
+        shutil.rmtree(retired_root, ignore_errors=True)
+        _remove_path(dest)
+        return None
+    return retired_root
+
+
+def _remove_retired_later(retired_root: Path) -> None:
+    worker = threading.Thread(target=shutil.rmtree, args=(retired_root,), kwargs={"ignore_errors": True})
+    worker.start()
+    _RETIRED_REMOVALS.append(worker)
+
+
+def _wait_for_retired_removals() -> None:
+    while _RETIRED_REMOVALS:
+        _RETIRED_REMOVALS.pop().join()
+
+
 def _apply_staged(skill: str, bucket: str, staged: Path) -> None:
-    dest = _target_root(bucket) / skill
-    if dest.exists() or dest.is_symlink():
-        if dest.is_symlink() or dest.is_file():
-            dest.unlink()
-        else:
-            shutil.rmtree(dest)
-    shutil.copytree(staged, dest)
+    dest = _skill_dest(bucket, skill)
+    _TREE_SIGNATURE_CACHE.pop(dest, None)
+    retired_root = _retire_dest(skill, dest)
+    try:
+        os.rename(staged, dest)
+    except OSError as exc:
+        if exc.errno != errno.EXDEV:
+            raise
+        _copy_tree(staged, dest)
+    finally:
+        # Rollback restores from the backup, so the retired tree is dropped either way.
+        if retired_root is not None:
+            _remove_retired_later(retired_root)
     if not (dest / "SKILL.md").is_file():
         raise RuntimeError("post-update validation failed (missing SKILL.md)")
 
 
+def _extract_tar(tar: tarfile.TarFile, target_root: Path) -> None:
+    if hasattr(tarfile, "data_filter"):
+        tar.extractall(target_root, filter="data")
+    else:
+        tar.extractall(target_root)
+
+
+def _extract_backup_tar(backup_path: Path, target_root: Path) -> None:
+    with tarfile.open(backup_path, "r") as tar:
+        _extract_tar(tar, target_root)
+
+
 def _restore_from_backup(skill: str, bucket: str, backup_path: Path | None, had_dest: bool) -> str:
-    dest = _target_root(bucket) / skill
+    dest = _skill_dest(bucket, skill)
     try:
-        if dest.exists() or dest.is_symlink():
-            if dest.is_symlink() or dest.is_file():
-                dest.unlink()
-            else:
-                shutil.rmtree(dest)
+        _remove_path(dest)
         if backup_path and backup_path.exists():
-            shutil.copytree(backup_path, dest)
+            if backup_path.suffix == ".tar":
+                _extract_backup_tar(backup_path, dest.parent)
+            else:
+                _copy_tree(backup_path, dest)
             return "restored_from_backup"
         if had_dest:
             return "failed_no_backup"
@@ -355,15 +1089,41 @@ def _restore_from_backup(skill: str, bucket: str, backup_path: Path | None, had_
         return f"rollback_error: {exc}"
 
 
-def _filter_rows(rows: list[UpdateRow], strategies: set[str], skills: set[str]) -> list[UpdateRow]:
-    out = []
-    for row in rows:
-        if strategies and row.strategy not in strategies:
-            continue
-        if skills and row.skill not in skills:
-            continue
-        out.append(row)
-    return out
+def _json_default(value: Any) -> Any:
+    # Shallow field mapping; dataclasses.asdict would deep-copy every nested list.
+    if is_dataclass(value):
+        return {f.name: getattr(value, f.name) for f in fields(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _ResultSink:
+    # Records results as they are decided and streams each one to the JSON Lines sidecar.
+    def __init__(self, jsonl_path: Path | None, keep_results: bool) -> None:
+        self.statuses: list[str] = []
+        self.results: dict[int, UpdateResult] | None = {} if keep_results else None
+        self._fp: io.TextIOBase | None = None
+        if jsonl_path:
+            jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fp = jsonl_path.open("w", encoding="utf-8")
+
+    def record(self, index: int, result: UpdateResult) -> None:
+        self.statuses.append(result.status)
+        if self.results is not None:
+            self.results[index] = result
+        if self._fp is not None:
+            line = {"index": index, **_json_default(result)}
+            self._fp.write(_JSON_ENCODER.encode(line) + "\n")
+            self._fp.flush()
+
+    def ordered(self) -> list[UpdateResult]:
+        if self.results is None:
+            return []
+        return [self.results[i] for i in sorted(self.results)]
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
 
 
 def _parse_args(argv: list[str]) -> argparse.Namespace:
@@ -390,42 +1150,173 @@ def _parse_args(argv: list[str]) -> argparse.Namespace:
     parser.add_argument("--fail-fast", action="store_true")
     parser.add_argument("--report", default="")
     parser.add_argument("--debug-artifacts", action="store_true")
+    parser.add_argument(
+        "--no-aggregate-report",
+        action="store_true",
+        help="Only write the JSON Lines sidecar (<report>.jsonl), not the aggregate JSON report",
+    )
     parser.add_argument(
         "--jobs",
         type=int,
         default=DEFAULT_JOBS,
         help=f"Parallel stage workers ({1}-{MAX_JOBS}, default: {DEFAULT_JOBS})",
     )
+    parser.add_argument(
+        "--repo-cache",
+        action="store_true",
+        help="Stage GitHub sources from shared bare clones under .cache/repos instead of one installer run per row",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["thread", "process"],
+        default=DEFAULT_EXECUTOR,
+        help=f"Stage worker pool type (default: {DEFAULT_EXECUTOR})",
+    )
     return parser.parse_args(argv)
 
 
-def _normalize_jobs(raw_jobs: int, fail_fast: bool) -> int:
-    if fail_fast:
-        return 1
+def _normalize_jobs(raw_jobs: int) -> int:
     return max(1, min(MAX_JOBS, raw_jobs))
 
 
+def _is_failure(result: UpdateResult | None) -> bool:
+    return result is not None and result.status in FAILED_STATUSES
+
+
+def _discard_stage_outputs(outputs: list[StageTaskResult]) -> None:
+    for out in outputs:
+        if out.temp_root and out.temp_root.exists():
+            shutil.rmtree(out.temp_root, ignore_errors=True)
+
+
+def _fail_fast_skipped(row: UpdateRow) -> UpdateResult:
+    return UpdateResult(
+        skill=row.skill,
+        strategy=row.strategy,
+        status="SKIPPED",
+        reason="fail_fast_cancelled",
+    )
+
+
+def _apply_one(out: StageTaskResult, backup_root: Path, no_backup: bool) -> UpdateResult:
+    backup_path: Path | None = None
+    had_dest = False
+    try:
+        backup_path, had_dest = _create_backup(out.row.skill, out.row.bucket, backup_root, no_backup)
+        _apply_staged(out.row.skill, out.row.bucket, out.staged)
+        if out.source_id:
+            _record_applied_source(_skill_dest(out.row.bucket, out.row.skill), out.source_id)
+        return UpdateResult(
+            skill=out.row.skill,
+            strategy=out.row.strategy,
+            status="SUCCESS",
+            reason="updated",
+            commands=out.commands,
+            backup_path=str(backup_path) if backup_path else None,
+        )
+    except Exception as exc:
+        rollback = _restore_from_backup(out.row.skill, out.row.bucket, backup_path, had_dest)
+        status = "FAILED" if rollback in {"restored_from_backup", "not_needed", "failed_no_backup"} else "FAILED_ROLLBACK"
+        return UpdateResult(
+            skill=out.row.skill,
+            strategy=out.row.strategy,
+            status=status,
+            reason=str(exc),
+            commands=out.commands,
+            backup_path=str(backup_path) if backup_path else None,
+            rollback=rollback,
+        )
+    finally:
+        if out.temp_root and out.temp_root.exists():
+            shutil.rmtree(out.temp_root, ignore_errors=True)
+
+
+def _failed_stage(index: int, row: UpdateRow, commands: list[str], reason: str) -> StageTaskResult:
+    return StageTaskResult(
+        index=index,
+        row=row,
+        commands=commands,
+        result=UpdateResult(
+            skill=row.skill,
+            strategy=row.strategy,
+            status="FAILED",
+            reason=reason,
+            commands=commands,
+            rollback="not_needed",
+        ),
+    )
+
+
+def _init_stage_worker(
+    allow_manual_map: bool,
+    source_map: dict[str, dict[str, str]],
+    dry_run: bool,
+    repo_cache: bool,
+    worker_process: bool = False,
+) -> None:
+    _STAGE_WORKER_ARGS.update(
+        allow_manual_map=allow_manual_map, source_map=source_map, dry_run=dry_run, repo_cache=repo_cache
+    )
+    if worker_process:
+        # Pool workers exit without atexit, so their cache writes would be lost with them.
+        for cache in _WORKER_CACHES:
+            cache.track_changes()
+
+
+def _stage_one_in_worker(index: int, row: UpdateRow) -> StageTaskResult:
+    out = _stage_one(index, row, **_STAGE_WORKER_ARGS)
+    changes = [cache.take_changes() for cache in _WORKER_CACHES]
+    if any(changes):
+        out.cache_changes = changes
+    return out
+
+
+def _merge_worker_cache_changes(out: StageTaskResult) -> None:
+    for cache, changes in zip(_WORKER_CACHES, out.cache_changes or ()):
+        cache.update(changes)
+    out.cache_changes = None
+
+
+def _stage_executor(
+    kind: str,
+    jobs: int,
+    allow_manual_map: bool,
+    source_map: dict[str, dict[str, str]],
+    dry_run: bool,
+    repo_cache: bool,
+) -> Executor:
+    # Staging mostly waits on the installer, disk and hashlib (which drops the GIL), so threads
+    # are the default; processes are opt-in for hosts where Python-side walking dominates.
+    if kind == "process":
+        return ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_stage_worker,
+            initargs=(allow_manual_map, source_map, dry_run, repo_cache, True),
+        )
+    _init_stage_worker(allow_manual_map, source_map, dry_run, repo_cache)
+    return ThreadPoolExecutor(max_workers=jobs)
+
+
 def _stage_one(
     index: int,
     row: UpdateRow,
     allow_manual_map: bool,
     source_map: dict[str, dict[str, str]],
     dry_run: bool,
+    repo_cache: bool = False,
 ) -> StageTaskResult:
     commands: list[str] = []
     temp_root: Path | None = None
     staged: Path | None = None
+    source_id: str | None = None
+    error: str | None = None
+    dest = _skill_dest(row.bucket, row.skill)
     try:
+        install_source: tuple[str, str, str] | None = None
         if row.strategy == "update-via-github":
             if row.repo in {"", "-"} or row.remote_path in {"", "-"}:
-                raise RuntimeError("missing repo/remote_path in check file")
-            temp_root, staged = _stage_from_installer(
-                skill=row.skill,
-                repo=row.repo,
-                skill_path=row.remote_path,
-                ref="main",
-                commands=commands,
-            )
+                return _failed_stage(index, row, commands, "missing repo/remote_path in check file")
+            install_source = (row.repo, row.remote_path, "main")
         elif row.strategy == "sync-from-claude-mirror":
             return StageTaskResult(
                 index=index,
@@ -439,7 +1330,22 @@ def _stage_one(
                 ),
             )
         elif row.strategy == "install-from-local-archive":
-            temp_root, staged = _stage_from_archive(row.skill, row.note)
+            archive = _archive_path_for(row.skill, row.note)
+            source_id = _archive_source_id(archive)
+            if source_id and _dest_matches_source(dest, source_id):
+                return StageTaskResult(
+                    index=index,
+                    row=row,
+                    commands=commands,
+                    result=UpdateResult(
+                        skill=row.skill,
+                        strategy=row.strategy,
+                        status="SKIPPED",
+                        reason="no_changes_detected",
+                        commands=commands,
+                    ),
+                )
+            temp_root, staged, error = _stage_from_archive(row.skill, archive)
         elif row.strategy in {"manual-source-map-required", "manual-system-source-map"}:
             if not allow_manual_map:
                 return StageTaskResult(
@@ -466,13 +1372,7 @@ def _stage_one(
                         reason="skill_not_found_in_source_map",
                     ),
                 )
-            temp_root, staged = _stage_from_installer(
-                skill=row.skill,
-                repo=cfg["repo"],
-                skill_path=cfg["path"],
-                ref=cfg.get("ref", "main"),
-                commands=commands,
-            )
+            install_source = (cfg["repo"], cfg["path"], cfg.get("ref", "main"))
         else:
             return StageTaskResult(
                 index=index,
@@ -486,10 +1386,39 @@ def _stage_one(
                 ),
             )
 
-        dest = _target_root(row.bucket) / row.skill
-        if dest.is_dir() and _fingerprint_tree(staged) == _fingerprint_tree(dest):
+        if install_source is not None:
+            repo, skill_path, ref = install_source
+            source_id = _github_source_id(repo, skill_path, ref)
+            if source_id and _dest_matches_source(dest, source_id):
+                return StageTaskResult(
+                    index=index,
+                    row=row,
+                    commands=commands,
+                    result=UpdateResult(
+                        skill=row.skill,
+                        strategy=row.strategy,
+                        status="SKIPPED",
+                        reason="no_upstream_change",
+                        commands=commands,
+                    ),
+                )
+            temp_root, staged, error = _stage_from_installer(
+                skill=row.skill,
+                repo=repo,
+                skill_path=skill_path,
+                ref=ref,
+                commands=commands,
+                repo_cache=repo_cache,
+            )
+
+        if error is not None or staged is None:
+            return _failed_stage(index, row, commands, error or "staging failed")
+
+        if dest.is_dir() and _trees_equal(staged, dest):
             if temp_root and temp_root.exists():
                 shutil.rmtree(temp_root, ignore_errors=True)
+            if source_id:
+                _record_applied_source(dest, source_id)
             return StageTaskResult(
                 index=index,
                 row=row,
@@ -525,26 +1454,26 @@ def _stage_one(
             commands=commands,
             temp_root=temp_root,
             staged=staged,
+            source_id=source_id,
         )
     except Exception as exc:
+        # Only unexpected errors (e.g. IO while fingerprinting) land here.
         if temp_root and temp_root.exists():
             shutil.rmtree(temp_root, ignore_errors=True)
-        return StageTaskResult(
-            index=index,
-            row=row,
-            commands=commands,
-            result=UpdateResult(
-                skill=row.skill,
-                strategy=row.strategy,
-                status="FAILED",
-                reason=str(exc),
-                commands=commands,
-                rollback="not_needed",
-            ),
-        )
+        return _failed_stage(index, row, commands, str(exc))
+
 
+def _reset_run_state() -> None:
+    # update_skills.py calls main() repeatedly in one process; nothing memoized may outlive a run.
+    _skill_dest.cache_clear()
+    _resolved_backup_root.cache_clear()
+    _prepare_backup_root.cache_clear()
+    _TREE_SIGNATURE_CACHE.clear()
 
-def main(argv: list[str]) -> int:
+
+def main(argv: list[str], check_input: TextIO | None = None) -> int:
+    # check_input stands in for stdin with --check-file - (update_skills.py runs check in-process).
+    _reset_run_state()
     args = _parse_args(argv)
     if args.debug_artifacts and not args.report:
         args.report = "skill_update_apply_report.debug.json"
@@ -576,141 +1505,174 @@ def main(argv: list[str]) -> int:
     source_map_local_path: Path | None = None
     if args.allow_manual_map:
         default_public_map, default_local_map = _default_source_map_paths()
-        source_map_path = Path(args.source_map).resolve() if args.source_map else default_public_map.resolve()
-        source_map_local_path = Path(args.source_map_local).resolve() if args.source_map_local else default_local_map.resolve()
+        source_map_path = Path(args.source_map).resolve() if args.source_map else default_public_map
+        source_map_local_path = Path(args.source_map_local).resolve() if args.source_map_local else default_local_map
         source_map = _load_merged_source_map(source_map_path, source_map_local_path)
 
-    check_text = sys.stdin.read() if args.check_file == "-" else check_file.read_text(encoding="utf-8")
     try:
-        rows = _load_rows(check_text, args.check_format)
+        if check_file is None:
+            selected, total_rows = _load_rows(check_input or sys.stdin, args.check_format, strategies, skills)
+        else:
+            selected, total_rows = _load_rows_from_path(check_file, args.check_format, strategies, skills)
     except ValueError as exc:
         print(f"Error: failed to parse check input: {exc}", file=sys.stderr)
         return 2
 
     self_skill_name = _self_skill_name()
-    selected = _filter_rows(rows, strategies, skills)
-    jobs = _normalize_jobs(args.jobs, args.fail_fast)
-    ordered_results: dict[int, UpdateResult] = {}
-    staged_for_apply: list[StageTaskResult] = []
+    jobs = _normalize_jobs(args.jobs)
+    jsonl_path = report_path.with_name(report_path.name + ".jsonl") if report_path else None
+    sink = _ResultSink(jsonl_path, keep_results=bool(report_path) and not args.no_aggregate_report)
 
     stage_inputs: list[tuple[int, UpdateRow]] = []
     for idx, row in enumerate(selected):
         if row.result == "FAIL":
-            ordered_results[idx] = UpdateResult(
-                skill=row.skill,
-                strategy=row.strategy,
-                status="SKIPPED",
-                reason="precheck_result_is_fail",
+            sink.record(
+                idx,
+                UpdateResult(
+                    skill=row.skill,
+                    strategy=row.strategy,
+                    status="SKIPPED",
+                    reason="precheck_result_is_fail",
+                ),
             )
             continue
         if row.bucket == "system":
-            ordered_results[idx] = UpdateResult(
-                skill=row.skill,
-                strategy=row.strategy,
-                status="SKIPPED",
-                reason="system_updates_disabled_per_policy",
+            sink.record(
+                idx,
+                UpdateResult(
+                    skill=row.skill,
+                    strategy=row.strategy,
+                    status="SKIPPED",
+                    reason="system_updates_disabled_per_policy",
+                ),
             )
             continue
         if os.name == "nt" and self_skill_name and row.skill == self_skill_name:
-            ordered_results[idx] = UpdateResult(
-                skill=row.skill,
-                strategy=row.strategy,
-                status="SKIPPED",
-                reason="self_update_disabled_on_windows_file_lock",
+            sink.record(
+                idx,
+                UpdateResult(
+                    skill=row.skill,
+                    strategy=row.strategy,
+                    status="SKIPPED",
+                    reason="self_update_disabled_on_windows_file_lock",
+                ),
             )
             continue
         stage_inputs.append((idx, row))
+    if args.executor == "thread" or jobs == 1:
+        # Shared stagings hand trees between threads; process workers stage independently.
+        _plan_shared_stages(stage_inputs, args.allow_manual_map, source_map)
+    _prefetch_remote_refs(stage_inputs, args.allow_manual_map, source_map)
 
+    # Each row is applied on the main thread as soon as its stage completes, overlapping
+    # installs of later rows with backups and swaps of earlier ones.
     if jobs == 1:
-        stage_outputs = []
-        for idx, row in stage_inputs:
-            out = _stage_one(idx, row, args.allow_manual_map, source_map, args.dry_run)
-            stage_outputs.append(out)
-            if args.fail_fast and out.result is not None and out.result.status in {"FAILED", "FAILED_ROLLBACK"}:
+        for pos, (idx, row) in enumerate(stage_inputs):
+            out = _stage_one(idx, row, args.allow_manual_map, source_map, args.dry_run, args.repo_cache)
+            result = out.result if out.result is not None else _apply_one(out, backup_root, args.no_backup)
+            sink.record(out.index, result)
+            if args.fail_fast and _is_failure(result):
+                # Later rows are never staged, but they stay in the report and the summary.
+                for later_idx, later_row in stage_inputs[pos + 1 :]:
+                    sink.record(later_idx, _fail_fast_skipped(later_row))
                 break
     else:
-        with ThreadPoolExecutor(max_workers=jobs) as executor:
-            stage_outputs = list(
-                executor.map(
-                    lambda x: _stage_one(x[0], x[1], args.allow_manual_map, source_map, args.dry_run),
-                    stage_inputs,
-                )
-            )
-
-    for out in stage_outputs:
-        if out.result is not None:
-            ordered_results[out.index] = out.result
-            if args.fail_fast and out.result.status in {"FAILED", "FAILED_ROLLBACK"}:
-                break
-            continue
-        staged_for_apply.append(out)
-
-    for out in sorted(staged_for_apply, key=lambda r: r.index):
-        backup_path: Path | None = None
-        had_dest = False
-        try:
-            backup_path, had_dest = _create_backup(out.row.skill, out.row.bucket, backup_root, args.no_backup)
-            _apply_staged(out.row.skill, out.row.bucket, out.staged)
-            ordered_results[out.index] = UpdateResult(
-                skill=out.row.skill,
-                strategy=out.row.strategy,
-                status="SUCCESS",
-                reason="updated",
-                commands=out.commands,
-                backup_path=str(backup_path) if backup_path else None,
-            )
-        except Exception as exc:
-            rollback = _restore_from_backup(out.row.skill, out.row.bucket, backup_path, had_dest)
-            status = "FAILED" if rollback in {"restored_from_backup", "not_needed", "failed_no_backup"} else "FAILED_ROLLBACK"
-            ordered_results[out.index] = UpdateResult(
-                skill=out.row.skill,
-                strategy=out.row.strategy,
-                status=status,
-                reason=str(exc),
-                commands=out.commands,
-                backup_path=str(backup_path) if backup_path else None,
-                rollback=rollback,
-            )
-            if args.fail_fast:
-                if out.temp_root and out.temp_root.exists():
-                    shutil.rmtree(out.temp_root, ignore_errors=True)
-                break
-        finally:
-            if out.temp_root and out.temp_root.exists():
-                shutil.rmtree(out.temp_root, ignore_errors=True)
-
-    results = [ordered_results[i] for i in sorted(ordered_results)]
+        with _stage_executor(
+            args.executor, jobs, args.allow_manual_map, source_map, args.dry_run, args.repo_cache
+        ) as executor:
+            futures = [executor.submit(_stage_one_in_worker, idx, row) for idx, row in stage_inputs]
+            positions = {future: pos for pos, future in enumerate(futures)}
+            # Under fail-fast, rows are applied strictly in input order so nothing after the
+            # first failing row is ever applied; stages that finish early wait in ready.
+            ready: dict[int, StageTaskResult] = {}
+            next_pos = 0
+            stopped = False
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                out = future.result()
+                _merge_worker_cache_changes(out)
+                if not args.fail_fast:
+                    result = out.result if out.result is not None else _apply_one(out, backup_root, args.no_backup)
+                    sink.record(out.index, result)
+                    continue
+                pos = positions[future]
+                ready[pos] = out
+                if _is_failure(out.result):
+                    # Rows after a failed stage can never be applied; stop staging them.
+                    for pending in futures[pos + 1 :]:
+                        pending.cancel()
+                while next_pos in ready:
+                    out = ready.pop(next_pos)
+                    next_pos += 1
+                    result = out.result if out.result is not None else _apply_one(out, backup_root, args.no_backup)
+                    sink.record(out.index, result)
+                    if _is_failure(result):
+                        stopped = True
+                        break
+                if stopped:
+                    for pending in futures[next_pos:]:
+                        pending.cancel()
+                    break
+        if stopped:
+            # The executor has waited for stages that were already running; none of these rows is
+            # applied, but each one still gets a report entry.
+            for pos in range(next_pos, len(futures)):
+                future = futures[pos]
+                idx, row = stage_inputs[pos]
+                out = future.result() if future.done() and not future.cancelled() else None
+                if out is not None:
+                    _merge_worker_cache_changes(out)
+                if out is not None and out.result is not None:
+                    sink.record(idx, out.result)
+                    continue
+                if out is not None:
+                    _discard_stage_outputs([out])
+                sink.record(idx, _fail_fast_skipped(row))
+
+    _release_shared_stages()
+    _wait_for_retired_removals()
+    try:
+        STAGING_ROOT.rmdir()
+    except OSError:
+        pass
 
+    sink.close()
+    statuses = sink.statuses
     summary = {
-        "total_rows": len(rows),
+        "total_rows": total_rows,
         "selected_rows": len(selected),
-        "success": sum(1 for r in results if r.status == "SUCCESS"),
-        "failed": sum(1 for r in results if r.status in {"FAILED", "FAILED_ROLLBACK"}),
-        "skipped": sum(1 for r in results if r.status == "SKIPPED"),
-        "dry_run": sum(1 for r in results if r.status == "DRY_RUN"),
+        "success": statuses.count("SUCCESS"),
+        "failed": sum(1 for status in statuses if status in FAILED_STATUSES),
+        "skipped": statuses.count("SKIPPED"),
+        "dry_run": statuses.count("DRY_RUN"),
     }
     if summary["failed"] == 0 and not args.dry_run and not args.no_backup:
         _prune_backup_generations(BACKUPS_ROOT, keep=DEFAULT_BACKUP_KEEP_GENERATIONS)
 
-    report: dict[str, Any] = {
-        "generated_at": dt.datetime.now().isoformat(),
-        "dry_run": args.dry_run,
-        "check_file": str(check_file) if check_file else "-",
-        "backup_root": str(backup_root),
-        "source_map_used": args.allow_manual_map,
-        "source_map_path": str(source_map_path) if source_map_path else None,
-        "source_map_local_path": str(source_map_local_path) if source_map_local_path else None,
-        "summary": summary,
-        "results": [r.__dict__ for r in results],
-    }
-    if report_path:
+    if report_path and not args.no_aggregate_report:
+        report: dict[str, Any] = {
+            "generated_at": dt.datetime.now().isoformat(),
+            "dry_run": args.dry_run,
+            "check_file": str(check_file) if check_file else "-",
+            "backup_root": str(backup_root),
+            "source_map_used": args.allow_manual_map,
+            "source_map_path": str(source_map_path) if source_map_path else None,
+            "source_map_local_path": str(source_map_local_path) if source_map_local_path else None,
+            "summary": summary,
+            "results": sink.ordered(),
+        }
         report_path.parent.mkdir(parents=True, exist_ok=True)
-        with report_path.open("w", encoding="utf-8") as fp:
-            json.dump(report, fp, ensure_ascii=False, indent=2)
+        report_path.write_text(
+            json.dumps(report, ensure_ascii=False, indent=2, default=_json_default),
+            encoding="utf-8",
+        )
 
     print(json.dumps(summary, ensure_ascii=False))
-    if report_path:
+    if report_path and not args.no_aggregate_report:
         print(f"report: {report_path}")
+    if jsonl_path:
+        print(f"report stream: {jsonl_path}")
     return 1 if summary["failed"] > 0 else 0
 
 
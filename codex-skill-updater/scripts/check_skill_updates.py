@@ -3,20 +3,32 @@
 
 from __future__ import annotations
 
+import atexit
+import functools
+import http.client
+import itertools
 import json
 import os
 import shutil
+import stat
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+import urllib.parse
 import argparse
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Callable, TextIO
+
+from skill_update_common import JsonCache, run_script
 
 CODEX_HOME = Path(os.environ.get("CODEX_HOME", str(Path.home() / ".codex")))
 SKILLS_ROOT = CODEX_HOME / "skills"
 DIST_ROOT = SKILLS_ROOT / "dist"
+CACHE_ROOT = SKILLS_ROOT / ".cache"
 INSTALLER_DIR = SKILLS_ROOT / ".system" / "skill-installer" / "scripts"
 LIST_SCRIPT = INSTALLER_DIR / "list-skills.py"
 INSTALL_SCRIPT = INSTALLER_DIR / "install-skill-from-github.py"
@@ -24,9 +36,97 @@ DEFAULT_REF = "main"
 DEFAULT_JOBS = 4
 MAX_JOBS = 8
 DEFAULT_FORMAT = "ndjson"
+OPENAI_CURATED_PREFIX = "skills/.curated/"
+OPENAI_SYSTEM_PREFIX = "skills/.system/"
+SKILLS_PREFIX = "skills/"
+# .skill-meta.json sources whose upstream check can tell a stale dist archive from a current one.
+TRACKED_SOURCES = ("github", "registry")
+# Public skill listings used to resolve skills without usable GitHub metadata: curated, system, anthropics.
+REMOTE_SET_SOURCES = (
+    ("openai/skills", "skills/.curated"),
+    ("openai/skills", "skills/.system"),
+    ("anthropics/skills", "skills"),
+)
+# Seconds a remote skill listing or successful probe is reused across runs (0 disables).
+DEFAULT_REMOTE_CACHE_TTL = 600
+# ETags unused for this long (seconds) are dropped, e.g. after the skill was uninstalled.
+ETAG_CACHE_MAX_AGE = 30 * 24 * 3600
+# `gh auth token` results are kept outside CODEX_HOME, which may be backed up or synced.
+GH_TOKEN_CACHE_DIR = (
+    Path(os.environ["XDG_CACHE_HOME"])
+    if os.path.isabs(os.environ.get("XDG_CACHE_HOME", ""))
+    else Path.home() / ".cache"
+) / "codex-skill-updater"
+GH_TOKEN_CACHE = GH_TOKEN_CACHE_DIR / "gh-token"
+# Seconds a token obtained from `gh auth token` is reused before asking gh again.
+GH_TOKEN_TTL = 3600
+GH_TOKEN_TIMEOUT = 10
+GITHUB_API_HOST = "api.github.com"
+GITHUB_API_TIMEOUT = 10
+# Candidate paths checked per GraphQL request.
+GRAPHQL_BATCH_SIZE = 100
+
+# json.dumps() with keyword options builds a new encoder per call; rows share this one.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+# Serializes the first _github_token() call so gh runs at most once.
+_GITHUB_TOKEN_LOCK = threading.Lock()
+# Set once api.github.com is unreachable so later probes go straight to the installer.
+_GITHUB_API_DOWN = threading.Event()
+# One keep-alive connection per probe worker, so TLS setup is paid once per thread.
+_HTTP_LOCAL = threading.local()
+# (repo, path) -> whether path/SKILL.md exists at DEFAULT_REF, prefetched in batches via GraphQL.
+_BATCH_PROBES: dict[tuple[str, str], bool] = {}
+# Numbers the per-probe destinations under _probe_root().
+_PROBE_COUNTER = itertools.count()
+
+
+# Remote lookups: "<kind>:repo@ref:path" -> [saved_at, value].
+_REMOTE_CACHE = JsonCache(CACHE_ROOT / "remote_lookups.json")
+# Contents-API probes: "repo@ref:path" -> [last_used_at, etag, ok, note], revalidated with If-None-Match.
+_ETAG_CACHE = JsonCache(CACHE_ROOT / "github_etags.json")
+
+
+def _remote_entry_fresh(entry: Any, ttl: int) -> bool:
+    if not isinstance(entry, list) or len(entry) != 2:
+        return False
+    saved_at = entry[0]
+    return isinstance(saved_at, (int, float)) and time.time() - saved_at <= ttl
+
+
+def _remote_cache_get(key: str, ttl: int) -> Any:
+    if ttl <= 0:
+        return None
+    entry = _REMOTE_CACHE.get(key)
+    return entry[1] if _remote_entry_fresh(entry, ttl) else None
+
+
+def _remote_cache_put(key: str, value: Any, ttl: int) -> None:
+    if ttl > 0:
+        _REMOTE_CACHE.set(key, [time.time(), value])
+
+
+def _prune_remote_cache(ttl: int) -> None:
+    # Expired entries are never read again, so they are dropped instead of piling up across runs.
+    if ttl > 0:
+        _REMOTE_CACHE.prune(lambda _key, entry: _remote_entry_fresh(entry, ttl))
+
+
+def _etag_entry_usable(entry: Any) -> bool:
+    return (
+        isinstance(entry, list)
+        and len(entry) == 4
+        and isinstance(entry[0], (int, float))
+        and isinstance(entry[1], str)
+        and time.time() - entry[0] <= ETAG_CACHE_MAX_AGE
+    )
+
 
+def _prune_etag_cache() -> None:
+    _ETAG_CACHE.prune(lambda _key, entry: _etag_entry_usable(entry))
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class SkillEntry:
     name: str
     local_path: Path
@@ -38,19 +138,12 @@ class SkillEntry:
     note: str
 
 
-def _run(cmd: list[str]) -> subprocess.CompletedProcess[str]:
-    return subprocess.run(
-        cmd,
-        text=True,
-        capture_output=True,
-        check=False,
-    )
-
-
-def _load_remote_set(repo: str, path: str) -> set[str]:
-    cmd = [
-        "python3",
-        str(LIST_SCRIPT),
+def _load_remote_set(repo: str, path: str, cache_ttl: int = 0) -> set[str]:
+    cache_key = f"list:{repo}@{DEFAULT_REF}:{path}"
+    cached = _remote_cache_get(cache_key, cache_ttl)
+    if isinstance(cached, list):
+        return set(cached)
+    argv = [
         "--repo",
         repo,
         "--ref",
@@ -60,68 +153,279 @@ def _load_remote_set(repo: str, path: str) -> set[str]:
         "--format",
         "json",
     ]
-    proc = _run(cmd)
-    if proc.returncode != 0:
-        print(proc.stderr.strip(), file=sys.stderr)
-        raise SystemExit(f"failed to load remote skills: {repo}:{path}")
-    data = json.loads(proc.stdout)
-    return {row["name"] for row in data}
+    returncode, stdout, stderr = run_script(LIST_SCRIPT, argv)
+    if returncode != 0:
+        raise RuntimeError(stderr.strip() or f"list-skills.py exited with {returncode}")
+    data = json.loads(stdout)
+    names = {row["name"] for row in data}
+    _remote_cache_put(cache_key, sorted(names), cache_ttl)
+    return names
+
+
+def _load_remote_sets(cache_ttl: int) -> list[set[str]]:
+    # The listings are independent round trips, so they are fetched concurrently.
+    with ThreadPoolExecutor(max_workers=len(REMOTE_SET_SOURCES)) as executor:
+        futures = [executor.submit(_load_remote_set, repo, path, cache_ttl) for repo, path in REMOTE_SET_SOURCES]
+    # Failures are reported once, in REMOTE_SET_SOURCES order, after every listing has finished.
+    failed = [
+        (f"{repo}:{path}", future.exception())
+        for (repo, path), future in zip(REMOTE_SET_SOURCES, futures)
+        if future.exception() is not None
+    ]
+    if failed:
+        for source, exc in failed:
+            print(f"{source}: {exc}", file=sys.stderr)
+        raise SystemExit("failed to load remote skills: " + ", ".join(source for source, _ in failed))
+    return [future.result() for future in futures]
 
 
-def _load_meta(path: Path) -> dict:
-    meta_path = path / ".skill-meta.json"
-    if not meta_path.is_file():
-        return {}
+@functools.lru_cache(maxsize=512)
+def _read_meta(meta_path: str, mtime_ns: int, size: int) -> dict:
+    # mtime_ns/size only key the cache, so an edited file is parsed again.
     try:
-        with meta_path.open("r", encoding="utf-8") as fp:
+        with open(meta_path, "r", encoding="utf-8") as fp:
             data = json.load(fp)
     except Exception:
         return {}
     return data if isinstance(data, dict) else {}
 
 
+def _load_meta(path: Path) -> dict:
+    meta_path = path / ".skill-meta.json"
+    try:
+        st = meta_path.stat()
+    except OSError:
+        return {}
+    if not stat.S_ISREG(st.st_mode):
+        return {}
+    # Callers get their own copy; the cached dict is shared.
+    return dict(_read_meta(str(meta_path), st.st_mtime_ns, st.st_size))
+
+
 def _collect_local_skills() -> list[tuple[str, Path, str, dict]]:
     skills: list[tuple[str, Path, str, dict]] = []
 
-    for path in sorted(SKILLS_ROOT.iterdir()):
-        if path.name.startswith("."):
+    # DirEntry type checks come from readdir, so plain skill dirs cost one stat (SKILL.md) each.
+    with os.scandir(SKILLS_ROOT) as it:
+        entries = sorted((e for e in it if not e.name.startswith(".")), key=lambda e: e.name)
+    for entry in entries:
+        if not entry.is_dir() or not os.path.isfile(os.path.join(entry.path, "SKILL.md")):
             continue
-        skill_md = path / "SKILL.md"
-        scan_path = path
-        if path.is_symlink():
-            resolved = path.resolve()
-            skill_md = resolved / "SKILL.md"
-            scan_path = resolved
-        if skill_md.is_file():
-            skills.append((path.name, path, "user", _load_meta(scan_path)))
+        path = Path(entry.path)
+        scan_path = path.resolve() if entry.is_symlink() else path
+        skills.append((entry.name, path, "user", _load_meta(scan_path)))
     return skills
 
 
-def _probe_install(repo: str, remote_path: str) -> tuple[bool, str]:
-    temp_root = Path(tempfile.mkdtemp(prefix="skill-update-probe-"))
+def _github_token() -> str:
+    # Resolved on the first GitHub API call, so runs that never reach the API never run gh.
+    with _GITHUB_TOKEN_LOCK:
+        return _resolve_github_token()
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_github_token() -> str:
+    # Env first, then a recent cached `gh auth token`, then gh itself.
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
     try:
-        cmd = [
-            "python3",
-            str(INSTALL_SCRIPT),
-            "--repo",
-            repo,
-            "--ref",
-            DEFAULT_REF,
-            "--path",
-            remote_path,
-            "--dest",
-            str(temp_root),
-        ]
-        proc = _run(cmd)
-        if proc.returncode == 0:
-            return True, "ok"
-        err = (proc.stderr or proc.stdout).strip().splitlines()
-        return False, err[-1] if err else "install probe failed"
-    finally:
-        shutil.rmtree(temp_root, ignore_errors=True)
+        if time.time() - GH_TOKEN_CACHE.stat().st_mtime < GH_TOKEN_TTL:
+            token = GH_TOKEN_CACHE.read_text(encoding="utf-8").strip()
+            if token:
+                return token
+    except OSError:
+        pass
+    gh = shutil.which("gh")
+    if not gh:
+        return ""
+    try:
+        proc = subprocess.run(
+            [gh, "auth", "token"], text=True, capture_output=True, check=False, timeout=GH_TOKEN_TIMEOUT
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return ""
+    token = proc.stdout.strip()
+    if proc.returncode != 0 or not token:
+        return ""
+    try:
+        GH_TOKEN_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # mkdir's mode is masked by the umask and ignored for an existing directory.
+        os.chmod(GH_TOKEN_CACHE_DIR, 0o700)
+        # mkstemp creates the file 0600, so the token is never readable by other users.
+        fd, tmp_name = tempfile.mkstemp(prefix=".gh-token.", dir=str(GH_TOKEN_CACHE_DIR))
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            fp.write(token)
+        os.replace(tmp_name, GH_TOKEN_CACHE)
+    except OSError:
+        # Caching is an optimization only.
+        pass
+    return token
+
+
+def _github_api_request(
+    method: str,
+    path: str,
+    body: bytes | None = None,
+    etag: str | None = None,
+) -> tuple[int, bytes, str | None]:
+    # (status, body, ETag); passing a previous ETag turns an unchanged resource into an empty 304.
+    headers = {"Accept": "application/vnd.github+json", "User-Agent": "codex-skill-updater"}
+    token = _github_token()
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if etag:
+        headers["If-None-Match"] = etag
+    conn = getattr(_HTTP_LOCAL, "conn", None)
+    if conn is not None:
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            return resp.status, resp.read(), resp.getheader("ETag")
+        except (http.client.HTTPException, OSError):
+            # The server may have dropped the idle keep-alive connection; retry once on a fresh one.
+            conn.close()
+    conn = http.client.HTTPSConnection(GITHUB_API_HOST, timeout=GITHUB_API_TIMEOUT)
+    _HTTP_LOCAL.conn = conn
+    conn.request(method, path, body=body, headers=headers)
+    resp = conn.getresponse()
+    return resp.status, resp.read(), resp.getheader("ETag")
+
+
+def _probe_contents_api(repo: str, remote_path: str) -> tuple[bool, str] | None:
+    # Directory listing only; None means inconclusive (private repo, rate limit, offline).
+    if _GITHUB_API_DOWN.is_set():
+        return None
+    api_path = (
+        f"/repos/{urllib.parse.quote(repo)}/contents/"
+        f"{urllib.parse.quote(remote_path.strip('/'))}?ref={urllib.parse.quote(DEFAULT_REF)}"
+    )
+    cache_key = f"{repo}@{DEFAULT_REF}:{remote_path}"
+    cached = _ETAG_CACHE.get(cache_key)
+    if not _etag_entry_usable(cached):
+        cached = None
+    try:
+        status, body, etag = _github_api_request("GET", api_path, etag=cached[1] if cached else None)
+    except (http.client.HTTPException, OSError):
+        _GITHUB_API_DOWN.set()
+        return None
+    if status == 304 and cached:
+        _ETAG_CACHE.set(cache_key, [time.time(), *cached[1:]])
+        return bool(cached[2]), str(cached[3])
+    if status != 200:
+        return None
+    try:
+        listing = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(listing, list):
+        result = (False, "remote path is not a directory")
+    elif any(isinstance(item, dict) and item.get("name") == "SKILL.md" for item in listing):
+        result = (True, "ok")
+    else:
+        result = (False, "SKILL.md not found in remote path")
+    if etag:
+        _ETAG_CACHE.set(cache_key, [time.time(), etag, *result])
+    return result
+
+
+def _query_skill_paths(repo: str, paths: list[str]) -> dict[str, bool]:
+    # One aliased object() lookup per path; an inaccessible repo yields nothing so REST/installer probes still run.
+    owner, _, name = repo.partition("/")
+    prefixes = ["" if path.strip("/") in ("", ".") else path.strip("/") + "/" for path in paths]
+    expressions = [f"{DEFAULT_REF}:{prefix}SKILL.md" for prefix in prefixes]
+    fields = " ".join(
+        f"p{i}: object(expression: {json.dumps(expr)}) {{ __typename }}" for i, expr in enumerate(expressions)
+    )
+    query = f"query {{ repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ {fields} }} }}"
+    try:
+        status, body, _ = _github_api_request("POST", "/graphql", json.dumps({"query": query}).encode("utf-8"))
+    except (http.client.HTTPException, OSError):
+        _GITHUB_API_DOWN.set()
+        return {}
+    if status != 200:
+        return {}
+    try:
+        repository = (json.loads(body).get("data") or {}).get("repository")
+    except (ValueError, AttributeError):
+        return {}
+    if not isinstance(repository, dict):
+        return {}
+    return {path: repository.get(f"p{i}") is not None for i, path in enumerate(paths) if f"p{i}" in repository}
+
+
+def _probe_cache_key(repo: str, remote_path: str) -> str:
+    return f"probe:{repo}@{DEFAULT_REF}:{remote_path}"
+
+
+def _prefetch_probes(candidate_lists: list[list[tuple[str, str, str]]], cache_ttl: int = 0) -> None:
+    # Paths with a cached successful probe are not queried again; new hits are written back to the cache.
+    by_repo: dict[str, list[str]] = {}
+    for candidates in candidate_lists:
+        for repo, path, _ in candidates:
+            if repo.count("/") != 1 or path in by_repo.get(repo, ()):
+                continue
+            if _remote_cache_get(_probe_cache_key(repo, path), cache_ttl):
+                continue
+            by_repo.setdefault(repo, []).append(path)
+    # GraphQL requires authentication, so without a token every candidate is probed individually.
+    if not by_repo or not _github_token():
+        return
+    for repo, paths in by_repo.items():
+        for start in range(0, len(paths), GRAPHQL_BATCH_SIZE):
+            if _GITHUB_API_DOWN.is_set():
+                return
+            found = _query_skill_paths(repo, paths[start : start + GRAPHQL_BATCH_SIZE])
+            _BATCH_PROBES.update({(repo, path): exists for path, exists in found.items()})
+            for path, exists in found.items():
+                if exists:
+                    _remote_cache_put(_probe_cache_key(repo, path), True, cache_ttl)
+
+
+@functools.lru_cache(maxsize=None)
+def _probe_root() -> Path:
+    # One scratch root per run; probe installs land in numbered subdirectories and are removed together at exit.
+    root = Path(tempfile.mkdtemp(prefix="skill-update-probes-"))
+    atexit.register(shutil.rmtree, root, ignore_errors=True)
+    return root
+
+
+def _probe_install(repo: str, remote_path: str, cache_ttl: int = 0) -> tuple[bool, str]:
+    # Only successful probes are cached; failures may be transient and are always retried.
+    cache_key = _probe_cache_key(repo, remote_path)
+    if _remote_cache_get(cache_key, cache_ttl):
+        return True, "ok"
+    # Batched hits were already written to the cache by _prefetch_probes.
+    exists = _BATCH_PROBES.get((repo, remote_path))
+    if exists is not None:
+        return (True, "ok") if exists else (False, "SKILL.md not found in remote path")
+    api_result = _probe_contents_api(repo, remote_path)
+    if api_result is not None:
+        if api_result[0]:
+            _remote_cache_put(cache_key, True, cache_ttl)
+        return api_result
+    # Fall back to a full installer run, which also covers SSH-only private repos.
+    dest = _probe_root() / str(next(_PROBE_COUNTER))
+    dest.mkdir()
+    argv = [
+        "--repo",
+        repo,
+        "--ref",
+        DEFAULT_REF,
+        "--path",
+        remote_path,
+        "--dest",
+        str(dest),
+    ]
+    returncode, stdout, stderr = run_script(INSTALL_SCRIPT, argv)
+    if returncode == 0:
+        _remote_cache_put(cache_key, True, cache_ttl)
+        return True, "ok"
+    err = (stderr or stdout).strip().splitlines()
+    return False, err[-1] if err else "install probe failed"
 
 
-def _resolve_candidates(
+def _candidates_from_public_lists(
     name: str,
     source_bucket: str,
     meta: dict,
@@ -129,44 +433,116 @@ def _resolve_candidates(
     openai_system: set[str],
     anthropics_skills: set[str],
 ) -> list[tuple[str, str, str]]:
+    # No useful metadata: resolve from known public lists.
     candidates: list[tuple[str, str, str]] = []
-    seen: set[tuple[str, str]] = set()
+    if name in openai_curated:
+        candidates.append(("openai/skills", OPENAI_CURATED_PREFIX + name, "name matched openai curated"))
+    if name in openai_system or source_bucket == "system":
+        candidates.append(("openai/skills", OPENAI_SYSTEM_PREFIX + name, "name matched openai system"))
+    if name in anthropics_skills:
+        candidates.append(("anthropics/skills", SKILLS_PREFIX + name, "name matched anthropics public"))
+    return candidates
 
-    def add(repo: str, path: str, reason: str) -> None:
-        key = (repo, path)
-        if key in seen:
-            return
-        seen.add(key)
-        candidates.append((repo, path, reason))
 
-    source = meta.get("source")
-    if source == "github" and meta.get("repo") and meta.get("skillPath"):
-        repo = str(meta["repo"])
-        skill_path = str(meta["skillPath"]).strip("/")
-        add(repo, skill_path, "meta github skillPath")
-        if not skill_path.startswith("skills/"):
-            add(repo, f"skills/{skill_path}", "meta github + skills/ prefix")
-    elif source == "registry":
-        # Registry does not expose a direct repo/path in metadata.
-        reg_name = str(meta.get("name", name))
-        if reg_name in openai_curated:
-            add("openai/skills", f"skills/.curated/{reg_name}", "registry matched openai curated")
-        if reg_name in openai_system:
-            add("openai/skills", f"skills/.system/{reg_name}", "registry matched openai system")
-        if reg_name in anthropics_skills:
-            add("anthropics/skills", f"skills/{reg_name}", "registry matched anthropics public")
-    else:
-        # No useful metadata: resolve from known public lists.
-        if name in openai_curated:
-            add("openai/skills", f"skills/.curated/{name}", "name matched openai curated")
-        if name in openai_system or source_bucket == "system":
-            add("openai/skills", f"skills/.system/{name}", "name matched openai system")
-        if name in anthropics_skills:
-            add("anthropics/skills", f"skills/{name}", "name matched anthropics public")
+def _candidates_from_registry(
+    name: str,
+    source_bucket: str,
+    meta: dict,
+    openai_curated: set[str],
+    openai_system: set[str],
+    anthropics_skills: set[str],
+) -> list[tuple[str, str, str]]:
+    # Registry does not expose a direct repo/path in metadata.
+    reg_name = str(meta.get("name", name))
+    candidates: list[tuple[str, str, str]] = []
+    if reg_name in openai_curated:
+        candidates.append(("openai/skills", OPENAI_CURATED_PREFIX + reg_name, "registry matched openai curated"))
+    if reg_name in openai_system:
+        candidates.append(("openai/skills", OPENAI_SYSTEM_PREFIX + reg_name, "registry matched openai system"))
+    if reg_name in anthropics_skills:
+        candidates.append(("anthropics/skills", SKILLS_PREFIX + reg_name, "registry matched anthropics public"))
+    return candidates
+
 
+def _candidates_from_github_meta(
+    name: str,
+    source_bucket: str,
+    meta: dict,
+    openai_curated: set[str],
+    openai_system: set[str],
+    anthropics_skills: set[str],
+) -> list[tuple[str, str, str]]:
+    if not (meta.get("repo") and meta.get("skillPath")):
+        return _candidates_from_public_lists(
+            name, source_bucket, meta, openai_curated, openai_system, anthropics_skills
+        )
+    repo = str(meta["repo"])
+    skill_path = str(meta["skillPath"]).strip("/")
+    candidates = [(repo, skill_path, "meta github skillPath")]
+    if not skill_path.startswith(SKILLS_PREFIX):
+        candidates.append((repo, SKILLS_PREFIX + skill_path, "meta github + skills/ prefix"))
     return candidates
 
 
+# meta["source"] -> candidate resolver; any other source falls back to the public lists.
+_CANDIDATE_RESOLVERS: dict[Any, Callable[..., list[tuple[str, str, str]]]] = {
+    "github": _candidates_from_github_meta,
+    "registry": _candidates_from_registry,
+}
+
+
+def _resolve_candidates(
+    name: str,
+    source_bucket: str,
+    meta: dict,
+    openai_curated: set[str],
+    openai_system: set[str],
+    anthropics_skills: set[str],
+) -> list[tuple[str, str, str]]:
+    source = meta.get("source")
+    # A hand-edited meta may carry a list or object here, which cannot be a dict key.
+    resolver = _candidates_from_public_lists
+    if isinstance(source, str):
+        resolver = _CANDIDATE_RESOLVERS.get(source, resolver)
+    found = resolver(name, source_bucket, meta, openai_curated, openai_system, anthropics_skills)
+    # First reason wins for a (repo, path) listed more than once.
+    unique: dict[tuple[str, str], str] = {}
+    for repo, path, reason in found:
+        unique.setdefault((repo, path), reason)
+    return [(repo, path, reason) for (repo, path), reason in unique.items()]
+
+
+def _needs_remote_sets(meta: dict) -> bool:
+    # Mirrors _resolve_candidates: only github metadata with repo+skillPath resolves without the listings.
+    return not (meta.get("source") == "github" and meta.get("repo") and meta.get("skillPath"))
+
+
+def _newest_mtime(root: Path) -> float:
+    newest = root.stat().st_mtime
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            try:
+                newest = max(newest, os.lstat(os.path.join(dirpath, filename)).st_mtime)
+            except OSError:
+                continue
+    return newest
+
+
+def _archive_is_current(name: str, local_path: Path, meta: dict) -> bool:
+    # A skill tracked upstream only takes the archive shortcut when the archive is no older than the
+    # installed tree; a stale archive would otherwise be extracted over a newer GitHub install.
+    try:
+        archive_mtime = (DIST_ROOT / f"{name}.skill").stat().st_mtime
+    except OSError:
+        return False
+    if meta.get("source") not in TRACKED_SOURCES:
+        return True
+    try:
+        return archive_mtime >= _newest_mtime(local_path)
+    except OSError:
+        return False
+
+
 def _strategy_for_skip(
     name: str,
     meta: dict,
@@ -199,6 +575,17 @@ def _parse_args(argv: list[str]) -> argparse.Namespace:
         default=DEFAULT_JOBS,
         help=f"Parallel probe workers ({1}-{MAX_JOBS}, default: {DEFAULT_JOBS})",
     )
+    parser.add_argument(
+        "--remote-cache-ttl",
+        type=int,
+        default=DEFAULT_REMOTE_CACHE_TTL,
+        help=f"Seconds to reuse cached remote listings and probes (0 disables, default: {DEFAULT_REMOTE_CACHE_TTL})",
+    )
+    parser.add_argument(
+        "--force-remote-probe",
+        action="store_true",
+        help="Probe GitHub sources even for skills with a local dist/<name>.skill archive",
+    )
     return parser.parse_args(argv)
 
 
@@ -206,21 +593,46 @@ def _normalize_jobs(raw_jobs: int) -> int:
     return max(1, min(MAX_JOBS, raw_jobs))
 
 
+def _probe_candidates(
+    candidate_lists: list[list[tuple[str, str, str]]],
+    jobs: int,
+    cache_ttl: int,
+) -> dict[tuple[str, str], tuple[bool, str]]:
+    # Round k probes the k-th candidate of every skill still unresolved, so each skill stops at its
+    # first hit as before, while a (repo, path) shared by several skills is probed only once.
+    probes: dict[tuple[str, str], tuple[bool, str]] = {}
+    depth_limit = max((len(c) for c in candidate_lists), default=0)
+    # A single job probes inline; no worker thread is started for it.
+    executor = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 and depth_limit else None
+
+    def probe(key: tuple[str, str]) -> tuple[bool, str]:
+        return _probe_install(key[0], key[1], cache_ttl)
+
+    try:
+        for depth in range(depth_limit):
+            wanted: dict[tuple[str, str], None] = {}
+            for candidates in candidate_lists:
+                if depth >= len(candidates):
+                    continue
+                if any(probes[(repo, path)][0] for repo, path, _ in candidates[:depth]):
+                    continue
+                key = (candidates[depth][0], candidates[depth][1])
+                if key not in probes:
+                    wanted[key] = None
+            results = list(executor.map(probe, wanted)) if executor else [probe(key) for key in wanted]
+            probes.update(zip(wanted, results))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return probes
+
+
 def _evaluate_skill(
     item: tuple[str, Path, str, dict],
-    openai_curated: set[str],
-    openai_system: set[str],
-    anthropics_skills: set[str],
+    candidates: list[tuple[str, str, str]],
+    probes: dict[tuple[str, str], tuple[bool, str]],
 ) -> SkillEntry:
     name, local_path, source_bucket, meta = item
-    candidates = _resolve_candidates(
-        name=name,
-        source_bucket=source_bucket,
-        meta=meta,
-        openai_curated=openai_curated,
-        openai_system=openai_system,
-        anthropics_skills=anthropics_skills,
-    )
     if not candidates:
         strategy, strategy_note = _strategy_for_skip(
             name,
@@ -242,7 +654,7 @@ def _evaluate_skill(
     remote_path = None
     note = "install probe failed"
     for candidate_repo, candidate_path, reason in candidates:
-        cand_ok, cand_note = _probe_install(candidate_repo, candidate_path)
+        cand_ok, cand_note = probes[(candidate_repo, candidate_path)]
         if cand_ok:
             ok = True
             repo = candidate_repo
@@ -264,78 +676,94 @@ def _evaluate_skill(
     )
 
 
-def main(argv: list[str]) -> int:
+def main(argv: list[str], out: TextIO | None = None) -> int:
+    # update_skills.py passes its own buffer as out to reuse the rows without a pipe.
+    # It also calls main() repeatedly in one process, so prefetched probes must not carry over.
+    _BATCH_PROBES.clear()
     args = _parse_args(argv)
+    out = out or sys.stdout
     jobs = _normalize_jobs(args.jobs)
 
     if not LIST_SCRIPT.is_file() or not INSTALL_SCRIPT.is_file():
         print("skill-installer scripts were not found in ~/.codex/skills/.system", file=sys.stderr)
         return 2
 
-    openai_curated = _load_remote_set("openai/skills", "skills/.curated")
-    openai_system = _load_remote_set("openai/skills", "skills/.system")
-    anthropics_skills = _load_remote_set("anthropics/skills", "skills")
-
+    cache_ttl = max(0, args.remote_cache_ttl)
     local_skills = _collect_local_skills()
-    if jobs == 1:
-        rows = [
-            _evaluate_skill(item, openai_curated, openai_system, anthropics_skills)
-            for item in local_skills
-        ]
+    # Skills with an up-to-date local dist archive go straight to install-from-local-archive without any network lookups.
+    archived = [
+        not args.force_remote_probe and _archive_is_current(name, local_path, meta)
+        for name, local_path, _, meta in local_skills
+    ]
+    if any(not skip and _needs_remote_sets(meta) for skip, (_, _, _, meta) in zip(archived, local_skills)):
+        openai_curated, openai_system, anthropics_skills = _load_remote_sets(cache_ttl)
     else:
-        with ThreadPoolExecutor(max_workers=jobs) as executor:
-            rows = list(
-                executor.map(
-                    lambda item: _evaluate_skill(item, openai_curated, openai_system, anthropics_skills),
-                    local_skills,
-                )
-            )
+        openai_curated, openai_system, anthropics_skills = set(), set(), set()
+    candidate_lists = [
+        []
+        if skip
+        else _resolve_candidates(
+            name=name,
+            source_bucket=source_bucket,
+            meta=meta,
+            openai_curated=openai_curated,
+            openai_system=openai_system,
+            anthropics_skills=anthropics_skills,
+        )
+        for skip, (name, _, source_bucket, meta) in zip(archived, local_skills)
+    ]
+    _prefetch_probes(candidate_lists, cache_ttl)
+    probes = _probe_candidates(candidate_lists, jobs, cache_ttl)
+    _prune_remote_cache(cache_ttl)
+    _prune_etag_cache()
+    rows = [_evaluate_skill(item, candidates, probes) for item, candidates in zip(local_skills, candidate_lists)]
     rows = sorted(rows, key=lambda r: r.name)
 
     total = len(rows)
     ok = sum(1 for r in rows if r.check == "OK")
     fail = sum(1 for r in rows if r.check == "FAIL")
     skip = sum(1 for r in rows if r.check == "SKIP")
+    # Rendered into one buffer and written once, instead of a write per row.
     if args.format == "tsv":
-        print("skill\tbucket\tresult\tstrategy\trepo\tremote_path\tnote")
-        for row in rows:
-            print(
-                f"{row.name}\t{row.source_bucket}\t{row.check}\t"
-                f"{row.strategy}\t"
-                f"{row.remote_repo or '-'}\t"
-                f"{row.remote_path or '-'}\t{row.note}"
-            )
-        print("")
-        print(f"summary: total={total} ok={ok} fail={fail} skip={skip}")
+        lines = ["skill\tbucket\tresult\tstrategy\trepo\tremote_path\tnote"]
+        lines.extend(
+            f"{row.name}\t{row.source_bucket}\t{row.check}\t"
+            f"{row.strategy}\t"
+            f"{row.remote_repo or '-'}\t"
+            f"{row.remote_path or '-'}\t{row.note}"
+            for row in rows
+        )
+        lines.append("")
+        lines.append(f"summary: total={total} ok={ok} fail={fail} skip={skip}")
     else:
-        for row in rows:
-            print(
-                json.dumps(
-                    {
-                        "type": "row",
-                        "skill": row.name,
-                        "bucket": row.source_bucket,
-                        "result": row.check,
-                        "strategy": row.strategy,
-                        "repo": row.remote_repo,
-                        "remote_path": row.remote_path,
-                        "note": row.note,
-                    },
-                    ensure_ascii=False,
-                )
+        lines = [
+            _JSON_ENCODER.encode(
+                {
+                    "type": "row",
+                    "skill": row.name,
+                    "bucket": row.source_bucket,
+                    "result": row.check,
+                    "strategy": row.strategy,
+                    "repo": row.remote_repo,
+                    "remote_path": row.remote_path,
+                    "note": row.note,
+                }
             )
-        print(
-            json.dumps(
+            for row in rows
+        ]
+        lines.append(
+            _JSON_ENCODER.encode(
                 {
                     "type": "summary",
                     "total": total,
                     "ok": ok,
                     "fail": fail,
                     "skip": skip,
-                },
-                ensure_ascii=False,
+                }
             )
         )
+    out.write("\n".join(lines) + "\n")
+    out.flush()
     return 1 if fail else 0
 
 
@@ -0,0 +1,194 @@
+"""Helpers shared by check_skill_updates.py and apply_skill_updates.py."""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import functools
+import importlib.util
+import inspect
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+# Set to 1 to always run the skill-installer scripts as subprocesses.
+SUBPROCESS_ENV = "CODEX_SKILL_UPDATER_SUBPROCESS"
+
+# Per-thread capture targets for in-process script runs.
+_OUTPUT_LOCAL = threading.local()
+_OUTPUT_ROUTER_LOCK = threading.Lock()
+
+
+class JsonCache:
+    """Lazily loaded JSON object, written back atomically at interpreter exit."""
+
+    def __init__(self, path: Path, keep: Callable[[str], bool] | None = None) -> None:
+        self.path = path
+        self._keep = keep
+        self._data: dict[str, Any] | None = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        # Entries set since the last take_changes(), when track_changes() is on.
+        self._changes: dict[str, Any] | None = None
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._load().get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._load()[key] = value
+            self._dirty = True
+            if self._changes is not None:
+                self._changes[key] = value
+
+    def update(self, entries: dict[str, Any]) -> None:
+        if not entries:
+            return
+        with self._lock:
+            self._load().update(entries)
+            self._dirty = True
+
+    def track_changes(self) -> None:
+        # For processes that exit without running atexit; their changes are shipped back instead.
+        with self._lock:
+            if self._changes is None:
+                self._changes = {}
+
+    def take_changes(self) -> dict[str, Any]:
+        with self._lock:
+            changes = self._changes or {}
+            if self._changes is not None:
+                self._changes = {}
+            return changes
+
+    def prune(self, keep: Callable[[str, Any], bool]) -> None:
+        with self._lock:
+            data = self._load()
+            stale = [key for key, value in data.items() if not keep(key, value)]
+            for key in stale:
+                del data[key]
+            if stale:
+                self._dirty = True
+
+    def _load(self) -> dict[str, Any]:
+        if self._data is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            self._data = data if isinstance(data, dict) else {}
+            atexit.register(self.save)
+        return self._data
+
+    def save(self) -> None:
+        with self._lock:
+            if self._data is None or not self._dirty:
+                return
+            data = self._data
+            if self._keep is not None:
+                data = {k: v for k, v in data.items() if self._keep(k)}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_name = tempfile.mkstemp(prefix=f".{self.path.name}.", dir=str(self.path.parent))
+                with os.fdopen(fd, "w", encoding="utf-8") as fp:
+                    json.dump(data, fp, ensure_ascii=False)
+                os.replace(tmp_name, self.path)
+            except OSError:
+                # The cache is an optimization only; never fail a run over it.
+                return
+            self._dirty = False
+
+
+class ThreadLocalStream:
+    """Stand-in for sys.stdout/sys.stderr that diverts writes of capturing threads."""
+
+    def __init__(self, name: str, fallback: Any) -> None:
+        self._name = name
+        self._fallback = fallback
+
+    def write(self, text: str) -> int:
+        target = getattr(_OUTPUT_LOCAL, self._name, None) or self._fallback
+        return target.write(text)
+
+    def flush(self) -> None:
+        target = getattr(_OUTPUT_LOCAL, self._name, None) or self._fallback
+        target.flush()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._fallback, name)
+
+
+def _install_output_router() -> None:
+    with _OUTPUT_ROUTER_LOCK:
+        if not isinstance(sys.stdout, ThreadLocalStream):
+            sys.stdout = ThreadLocalStream("stdout", sys.stdout)
+        if not isinstance(sys.stderr, ThreadLocalStream):
+            sys.stderr = ThreadLocalStream("stderr", sys.stderr)
+
+
+@contextlib.contextmanager
+def capture_thread_output() -> Iterator[tuple[io.StringIO, io.StringIO]]:
+    # contextlib.redirect_* swaps the streams process-wide, which breaks when several threads capture.
+    _install_output_router()
+    out, err = io.StringIO(), io.StringIO()
+    _OUTPUT_LOCAL.stdout, _OUTPUT_LOCAL.stderr = out, err
+    try:
+        yield out, err
+    finally:
+        _OUTPUT_LOCAL.stdout = _OUTPUT_LOCAL.stderr = None
+
+
+@functools.lru_cache(maxsize=None)
+def load_script_main(script: Path) -> Callable[[list[str]], Any] | None:
+    # Only scripts exposing main(argv) can run in-process; anything else keeps the subprocess path.
+    if os.environ.get(SUBPROCESS_ENV) == "1":
+        return None
+    scripts_dir = str(script.parent)
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+    try:
+        module_name = "_codex_" + script.stem.replace("-", "_")
+        spec = importlib.util.spec_from_file_location(module_name, script)
+        if spec is None or spec.loader is None:
+            return None
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        entry = getattr(module, "main", None)
+        if not callable(entry) or not inspect.signature(entry).parameters:
+            return None
+    except Exception:
+        return None
+    return entry
+
+
+def run_script(script: Path, argv: list[str], capture_stdout: bool = True) -> tuple[int, str, str]:
+    # (returncode, stdout, stderr), the same whether the script ran in-process or as a subprocess.
+    entry = load_script_main(script)
+    if entry is None:
+        # Without capture_stdout the subprocess's stdout is discarded unbuffered and comes back empty.
+        stdout = subprocess.PIPE if capture_stdout else subprocess.DEVNULL
+        proc = subprocess.run(
+            ["python3", str(script), *argv], text=True, stdout=stdout, stderr=subprocess.PIPE, check=False
+        )
+        return proc.returncode, proc.stdout or "", proc.stderr
+    with capture_thread_output() as (out, err):
+        try:
+            code = entry(argv)
+        except SystemExit as exc:
+            code = exc.code
+        except Exception as exc:
+            print(f"{type(exc).__name__}: {exc}", file=sys.stderr)
+            code = 1
+    if code is None:
+        code = 0
+    elif not isinstance(code, int):
+        print(code, file=err)
+        code = 1
+    return code, out.getvalue(), err.getvalue()
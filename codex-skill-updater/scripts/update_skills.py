@@ -8,6 +8,7 @@ Debug mode: writes fixed artifact files in current directory.
 from __future__ import annotations
 
 import argparse
+import io
 import subprocess
 import sys
 from pathlib import Path
@@ -35,18 +36,51 @@ def _parse_args(argv: list[str]) -> argparse.Namespace:
     parser.add_argument("--skill", action="append", default=[])
     parser.add_argument("--debug-artifacts", action="store_true")
     parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--repo-cache", action="store_true")
+    parser.add_argument("--remote-cache-ttl", type=int, default=None)
+    parser.add_argument("--force-remote-probe", action="store_true")
+    parser.add_argument(
+        "--legacy-subprocess",
+        action="store_true",
+        help="Run check/apply as separate python3 processes instead of in-process.",
+    )
     return parser.parse_args(argv)
 
 
-def main(argv: list[str]) -> int:
-    args = _parse_args(argv)
+def _check_argv(args: argparse.Namespace) -> list[str]:
+    check_argv = ["--format", "ndjson", "--jobs", str(args.jobs)]
+    if args.remote_cache_ttl is not None:
+        check_argv.extend(["--remote-cache-ttl", str(args.remote_cache_ttl)])
+    if args.force_remote_probe:
+        check_argv.append("--force-remote-probe")
+    return check_argv
 
-    check_proc = subprocess.run(
-        ["python3", str(CHECK_SCRIPT), "--format", "ndjson", "--jobs", str(args.jobs)],
-        text=True,
-        capture_output=True,
-        check=False,
-    )
+
+def _apply_argv(args: argparse.Namespace) -> list[str]:
+    apply_argv = ["--check-file", "-", "--check-format", "ndjson", "--jobs", str(args.jobs)]
+    if args.dry_run:
+        apply_argv.append("--dry-run")
+    if args.allow_manual_map:
+        apply_argv.append("--allow-manual-map")
+    if args.source_map:
+        apply_argv.extend(["--source-map", args.source_map])
+    if args.source_map_local:
+        apply_argv.extend(["--source-map-local", args.source_map_local])
+    if args.fail_fast:
+        apply_argv.append("--fail-fast")
+    if args.repo_cache:
+        apply_argv.append("--repo-cache")
+    if args.debug_artifacts:
+        apply_argv.extend(["--report", DEBUG_REPORT_FILE])
+    for strategy in args.strategy:
+        apply_argv.extend(["--strategy", strategy])
+    for skill in args.skill:
+        apply_argv.extend(["--skill", skill])
+    return apply_argv
+
+
+def _main_subprocess(args: argparse.Namespace) -> int:
+    check_proc = _run(["python3", str(CHECK_SCRIPT), *_check_argv(args)])
     if check_proc.returncode != 0:
         if check_proc.stdout:
             print(check_proc.stdout, end="", file=sys.stdout)
@@ -58,34 +92,7 @@ def main(argv: list[str]) -> int:
     if args.debug_artifacts:
         Path(DEBUG_CHECK_FILE).write_text(check_output, encoding="utf-8")
 
-    apply_cmd = [
-        "python3",
-        str(APPLY_SCRIPT),
-        "--check-file",
-        "-",
-        "--check-format",
-        "ndjson",
-        "--jobs",
-        str(args.jobs),
-    ]
-    if args.dry_run:
-        apply_cmd.append("--dry-run")
-    if args.allow_manual_map:
-        apply_cmd.append("--allow-manual-map")
-    if args.source_map:
-        apply_cmd.extend(["--source-map", args.source_map])
-    if args.source_map_local:
-        apply_cmd.extend(["--source-map-local", args.source_map_local])
-    if args.fail_fast:
-        apply_cmd.append("--fail-fast")
-    if args.debug_artifacts:
-        apply_cmd.extend(["--report", DEBUG_REPORT_FILE])
-    for strategy in args.strategy:
-        apply_cmd.extend(["--strategy", strategy])
-    for skill in args.skill:
-        apply_cmd.extend(["--skill", skill])
-
-    apply_proc = _run(apply_cmd, input_text=check_output)
+    apply_proc = _run(["python3", str(APPLY_SCRIPT), *_apply_argv(args)], input_text=check_output)
     if apply_proc.stdout:
         print(apply_proc.stdout, end="", file=sys.stdout)
     if apply_proc.stderr:
@@ -93,5 +100,27 @@ def main(argv: list[str]) -> int:
     return apply_proc.returncode
 
 
+def main(argv: list[str]) -> int:
+    args = _parse_args(argv)
+    if args.legacy_subprocess:
+        return _main_subprocess(args)
+
+    # Imported lazily so --legacy-subprocess never loads them; both live next to this script.
+    import apply_skill_updates
+    import check_skill_updates
+
+    check_buffer = io.StringIO()
+    check_code = check_skill_updates.main(_check_argv(args), out=check_buffer)
+    check_output = check_buffer.getvalue()
+    if check_code != 0:
+        print(check_output, end="", file=sys.stdout)
+        return check_code
+
+    if args.debug_artifacts:
+        Path(DEBUG_CHECK_FILE).write_text(check_output, encoding="utf-8")
+
+    return apply_skill_updates.main(_apply_argv(args), check_input=io.StringIO(check_output))
+
+
 if __name__ == "__main__":
     raise SystemExit(main(sys.argv[1:]))
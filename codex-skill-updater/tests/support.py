@@ -0,0 +1,176 @@
+"""Fake CODEX_HOME / skill-installer fixtures shared by the script tests."""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+# Stand-in for install-skill-from-github.py: copies $FAKE_REMOTE/<repo>/<path> into --dest/<name>.
+# FAKE_INSTALL_DELAY="skill=seconds,..." slows individual installs down.
+FAKE_INSTALLER = '''\
+import argparse, os, shutil, sys, time
+from pathlib import Path
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repo")
+    parser.add_argument("--path")
+    parser.add_argument("--ref", default="main")
+    parser.add_argument("--name")
+    parser.add_argument("--dest")
+    args = parser.parse_args(argv)
+    name = args.name or Path(args.path).name
+    delays = dict(item.split("=") for item in os.environ.get("FAKE_INSTALL_DELAY", "").split(",") if item)
+    time.sleep(float(delays.get(name, 0)))
+    src = Path(os.environ["FAKE_REMOTE"]) / args.repo / args.path
+    if not (src / "SKILL.md").is_file():
+        print(f"Error: not found {args.repo}:{args.path}", file=sys.stderr)
+        return 1
+    shutil.copytree(src, Path(args.dest) / name)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
+'''
+
+# Stand-in for list-skills.py: lists the directories under $FAKE_REMOTE/<repo>/<path>.
+# FAKE_LIST_FAIL="repo:path,..." makes listings fail; FAKE_LIST_DELAY="repo:path=seconds,..." slows them down.
+FAKE_LISTER = '''\
+import argparse, json, os, sys, time
+from pathlib import Path
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repo")
+    parser.add_argument("--path")
+    parser.add_argument("--ref", default="main")
+    parser.add_argument("--format")
+    args = parser.parse_args(argv)
+    source = f"{args.repo}:{args.path}"
+    delays = dict(item.rsplit("=", 1) for item in os.environ.get("FAKE_LIST_DELAY", "").split(",") if item)
+    time.sleep(float(delays.get(source, 0)))
+    if source in os.environ.get("FAKE_LIST_FAIL", "").split(","):
+        print(f"Error: cannot list {source}", file=sys.stderr)
+        return 1
+    base = Path(os.environ["FAKE_REMOTE"]) / args.repo / args.path
+    rows = [{"name": d.name} for d in sorted(base.iterdir())] if base.is_dir() else []
+    print(json.dumps(rows))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
+'''
+
+
+# Stand-in for the gh CLI: `gh auth token` prints a token and logs each call to $FAKE_GH_LOG.
+FAKE_GH = """\
+#!/bin/sh
+echo "$*" >> "$FAKE_GH_LOG"
+echo fake-gh-token
+"""
+
+
+def write_fake_gh(bin_dir: Path) -> Path:
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    gh = bin_dir / "gh"
+    gh.write_text(FAKE_GH, encoding="utf-8")
+    gh.chmod(0o755)
+    return gh
+
+
+def write_skill(path: Path, body: str) -> Path:
+    (path / "sub").mkdir(parents=True, exist_ok=True)
+    (path / "SKILL.md").write_text(f"# {body}\n", encoding="utf-8")
+    (path / "sub" / "data.txt").write_text(f"data {body}\n", encoding="utf-8")
+    return path
+
+
+class FakeHomeTestCase(unittest.TestCase):
+    """Temp CODEX_HOME with a fake skill-installer, plus a local directory standing in for GitHub."""
+
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.codex_home = self.root / "codex"
+        self.skills_root = self.codex_home / "skills"
+        self.remote = self.root / "remote"
+        self.git_root = self.root / "git"
+        installer_dir = self.skills_root / ".system" / "skill-installer" / "scripts"
+        installer_dir.mkdir(parents=True)
+        (installer_dir / "install-skill-from-github.py").write_text(FAKE_INSTALLER, encoding="utf-8")
+        (installer_dir / "list-skills.py").write_text(FAKE_LISTER, encoding="utf-8")
+        self.remote.mkdir()
+
+    def env(self, **extra: str) -> dict[str, str]:
+        env = {
+            **os.environ,
+            "CODEX_HOME": str(self.codex_home),
+            "FAKE_REMOTE": str(self.remote),
+            "XDG_CACHE_HOME": str(self.root / "xdg-cache"),
+            # Point git (ls-remote, --repo-cache) at local repos from git_remote_skill() instead of github.com.
+            "GIT_CONFIG_COUNT": "2",
+            "GIT_CONFIG_KEY_0": f"url.file://{self.git_root}/.insteadOf",
+            "GIT_CONFIG_VALUE_0": "https://github.com/",
+            "GIT_CONFIG_KEY_1": f"url.file://{self.git_root}/.insteadOf",
+            "GIT_CONFIG_VALUE_1": "git@github.com:",
+        }
+        env.pop("GH_TOKEN", None)
+        env.pop("GITHUB_TOKEN", None)
+        env.update(extra)
+        return env
+
+    def run_script(self, script: str, *argv: str, input_text: str | None = None, **env: str) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / script), *argv],
+            text=True,
+            input=input_text,
+            capture_output=True,
+            cwd=str(self.root),
+            env=self.env(**env),
+            check=False,
+            timeout=120,
+        )
+
+    def remote_skill(self, repo: str, path: str, body: str) -> Path:
+        return write_skill(self.remote / repo / path, body)
+
+    def git_remote_skill(self, repo: str, path: str, body: str) -> str:
+        """Commit the skill to the local repo standing in for github.com/<repo>; returns the commit."""
+        work = self.git_root / f"{repo}.git"
+        if not work.is_dir():
+            self._git(["init", "--quiet", "--initial-branch", "main", str(work)])
+        write_skill(work / path, body)
+        self._git(["-C", str(work), "add", "--all"])
+        self._git(["-C", str(work), "commit", "--quiet", "--message", body])
+        return self._git(["-C", str(work), "rev-parse", "HEAD"]).strip()
+
+    def _git(self, args: list[str]) -> str:
+        identity = ["-c", "user.name=test", "-c", "user.email=test@example.com", "-c", "commit.gpgsign=false"]
+        proc = subprocess.run(["git", *identity, *args], text=True, capture_output=True, check=True)
+        return proc.stdout
+
+    def installed_skill(self, name: str, body: str) -> Path:
+        return write_skill(self.skills_root / name, body)
+
+    def write_check_file(self, rows: list[dict[str, str]]) -> Path:
+        check_file = self.root / "check.ndjson"
+        lines = [json.dumps({"type": "row", "bucket": "user", "result": "OK", "note": "", **row}) for row in rows]
+        check_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return check_file
+
+    def read_report(self, path: Path) -> dict:
+        return json.loads(path.read_text(encoding="utf-8"))
@@ -0,0 +1,462 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import tarfile
+import tempfile
+import time
+import unittest
+import zipfile
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from support import FakeHomeTestCase, write_skill
+
+import apply_skill_updates as apply_mod
+from skill_update_common import JsonCache
+
+# os.stat before any test patches it.
+_REAL_STAT = os.stat
+
+
+def _github_row(skill: str, path: str) -> dict[str, str]:
+    return {"skill": skill, "strategy": "update-via-github", "repo": "example/skills", "remote_path": path}
+
+
+class FailFastTest(FakeHomeTestCase):
+    def _run_fail_fast(self, *extra: str, extra_rows: list[dict[str, str]] | None = None, **env: str) -> dict:
+        # beta's source is missing, so its stage fails; alpha stages slowly, gamma quickly.
+        for name in ("alpha", "beta", "gamma"):
+            self.installed_skill(name, f"{name} v1")
+        self.remote_skill("example/skills", "skills/alpha", "alpha v2")
+        self.remote_skill("example/skills", "skills/gamma", "gamma v2")
+        check_file = self.write_check_file(
+            [
+                _github_row("alpha", "skills/alpha"),
+                _github_row("beta", "skills/beta"),
+                _github_row("gamma", "skills/gamma"),
+                *(extra_rows or []),
+            ]
+        )
+        report = self.root / "report.json"
+        proc = self.run_script(
+            "apply_skill_updates.py",
+            "--check-file",
+            str(check_file),
+            "--fail-fast",
+            "--report",
+            str(report),
+            *extra,
+            **env,
+        )
+        self.assertEqual(proc.returncode, 1, proc.stderr)
+        return self.read_report(report)
+
+    def _assert_stopped_at_beta(self, report: dict) -> None:
+        statuses = {r["skill"]: (r["status"], r["reason"]) for r in report["results"]}
+        self.assertEqual(statuses["alpha"], ("SUCCESS", "updated"))
+        self.assertEqual(statuses["beta"][0], "FAILED")
+        self.assertEqual(statuses["gamma"], ("SKIPPED", "fail_fast_cancelled"))
+        self.assertIn("alpha v2", (self.skills_root / "alpha" / "SKILL.md").read_text())
+        self.assertIn("gamma v1", (self.skills_root / "gamma" / "SKILL.md").read_text())
+
+    def test_out_of_order_completion_applies_only_rows_before_the_failure(self) -> None:
+        report = self._run_fail_fast("--jobs", "3", FAKE_INSTALL_DELAY="alpha=1.0")
+        self._assert_stopped_at_beta(report)
+        self.assertEqual([r["skill"] for r in report["results"]], ["alpha", "beta", "gamma"])
+
+    def test_serial_run_reports_rows_after_the_failure(self) -> None:
+        report = self._run_fail_fast("--jobs", "1")
+        self._assert_stopped_at_beta(report)
+        self._assert_summary_complete(report)
+
+    def test_summary_accounts_for_every_selected_row(self) -> None:
+        report = self._run_fail_fast("--jobs", "3", FAKE_INSTALL_DELAY="alpha=1.0")
+        self._assert_summary_complete(report)
+
+    def test_shared_stage_consumers_after_the_failure_are_reported(self) -> None:
+        # gamma and gamma-copy share one installer run; both sit after the failing row.
+        self.installed_skill("gamma-copy", "gamma v1")
+        for jobs in ("1", "3"):
+            with self.subTest(jobs=jobs):
+                report = self._run_fail_fast(
+                    "--jobs", jobs, FAKE_INSTALL_DELAY="alpha=0.5", extra_rows=[_github_row("gamma-copy", "skills/gamma")]
+                )
+                statuses = {r["skill"]: (r["status"], r["reason"]) for r in report["results"]}
+                self.assertEqual(statuses["gamma-copy"], ("SKIPPED", "fail_fast_cancelled"))
+                self._assert_summary_complete(report)
+                self.assertEqual(report["summary"]["selected_rows"], 4)
+                self.assertFalse((self.skills_root / ".tmp").exists())
+                self.assertIn("gamma v1", (self.skills_root / "gamma-copy" / "SKILL.md").read_text())
+
+    def _assert_summary_complete(self, report: dict) -> None:
+        summary = report["summary"]
+        self.assertEqual(
+            summary["success"] + summary["failed"] + summary["skipped"] + summary["dry_run"],
+            summary["selected_rows"],
+        )
+        self.assertEqual(len(report["results"]), summary["selected_rows"])
+
+
+def _edit_keeping_size_and_mtime(path: Path, text: str) -> None:
+    st = path.stat()
+    assert len(text.encode("utf-8")) == st.st_size
+    # Timestamps are taken from a coarse kernel clock; make sure the edit lands on a new tick.
+    time.sleep(0.05)
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+class FileDigestCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        cache = JsonCache(self.root / "fingerprints.json")
+        patcher = mock.patch.object(apply_mod, "_FILE_DIGEST_CACHE", cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Never write the throwaway cache back at interpreter exit.
+        self.addCleanup(setattr, cache, "_dirty", False)
+
+    def test_same_size_edit_with_restored_mtime_is_rehashed(self) -> None:
+        path = self.root / "SKILL.md"
+        path.write_text("# alpha v1\n", encoding="utf-8")
+        before = apply_mod._hash_file_cached(str(path))
+        _edit_keeping_size_and_mtime(path, "# alpha v9\n")
+        self.assertNotEqual(apply_mod._hash_file_cached(str(path)), before)
+        self.assertEqual(apply_mod._hash_file_cached(str(path)), apply_mod._hash_file(str(path)))
+
+    def test_unchanged_file_is_served_from_cache(self) -> None:
+        path = self.root / "SKILL.md"
+        path.write_text("# alpha\n", encoding="utf-8")
+        apply_mod._hash_file_cached(str(path))
+        with mock.patch.object(apply_mod, "_hash_file", side_effect=AssertionError("rehashed")):
+            apply_mod._hash_file_cached(str(path))
+
+
+class ChangeDetectionTest(FakeHomeTestCase):
+    def _apply(self) -> dict:
+        check_file = self.write_check_file([_github_row("alpha", "skills/alpha")])
+        report = self.root / "report.json"
+        proc = self.run_script("apply_skill_updates.py", "--check-file", str(check_file), "--report", str(report))
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        return self.read_report(report)["results"][0]
+
+    def test_local_edit_hidden_from_mtime_and_size_is_detected(self) -> None:
+        self.remote_skill("example/skills", "skills/alpha", "alpha")
+        installed = self.installed_skill("alpha", "alpha")
+        self.assertEqual(self._apply()["reason"], "no_changes_detected")
+
+        for name in ("SKILL.md", "sub/data.txt"):
+            with self.subTest(edited=name):
+                path = installed / name
+                original = path.read_text(encoding="utf-8")
+                _edit_keeping_size_and_mtime(path, original.replace("alpha", "ALPHA"))
+                result = self._apply()
+                self.assertEqual((result["status"], result["reason"]), ("SUCCESS", "updated"))
+                self.assertEqual(path.read_text(encoding="utf-8"), original)
+
+
+class ReportSidecarTest(FakeHomeTestCase):
+    def test_jsonl_sidecar_never_overwrites_the_report(self) -> None:
+        self.remote_skill("example/skills", "skills/alpha", "alpha v2")
+        self.installed_skill("alpha", "alpha v1")
+        check_file = self.write_check_file([_github_row("alpha", "skills/alpha")])
+        for name in ("report.json", "report.jsonl"):
+            with self.subTest(report=name):
+                report = self.root / name
+                proc = self.run_script(
+                    "apply_skill_updates.py", "--check-file", str(check_file), "--dry-run", "--report", str(report)
+                )
+                self.assertEqual(proc.returncode, 0, proc.stderr)
+                self.assertEqual(self.read_report(report)["summary"]["dry_run"], 1)
+                lines = (self.root / f"{name}.jsonl").read_text(encoding="utf-8").splitlines()
+                self.assertEqual([json.loads(line)["skill"] for line in lines], ["alpha"])
+
+
+def _write_archive(path: Path, skill: str, body: str) -> Path:
+    # SKILL.md stored, the larger data file deflated, plus an explicit directory entry.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr(f"{skill}/SKILL.md", f"# {body}\n", compress_type=zipfile.ZIP_STORED)
+        zf.writestr(f"{skill}/sub/", "")
+        zf.writestr(f"{skill}/sub/data.txt", f"data {body}\n" * 200_000, compress_type=zipfile.ZIP_DEFLATED)
+        zf.writestr(f"{skill}/sub/deeper/raw.bin", bytes(range(256)) * 5000, compress_type=zipfile.ZIP_STORED)
+    return path
+
+
+class ExtractArchiveTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        self.archive = _write_archive(self.root / "alpha.skill", "alpha", "alpha")
+
+    def _assert_extracted(self, dest: Path) -> None:
+        with zipfile.ZipFile(self.archive) as zf:
+            for info in zf.infolist():
+                target = dest / info.filename
+                if info.is_dir():
+                    self.assertTrue(target.is_dir(), info.filename)
+                else:
+                    self.assertEqual(target.read_bytes(), zf.read(info), info.filename)
+
+    def test_stored_and_deflated_members_are_extracted(self) -> None:
+        dest = self.root / "out"
+        apply_mod._extract_archive(self.archive, dest)
+        self._assert_extracted(dest)
+
+    def test_stored_members_fall_back_to_streaming(self) -> None:
+        dest = self.root / "out"
+        with mock.patch.object(apply_mod.os, "copy_file_range", side_effect=OSError("unsupported"), create=True):
+            apply_mod._extract_archive(self.archive, dest)
+        self._assert_extracted(dest)
+
+    def test_corrupted_stored_member_fails_the_crc_check(self) -> None:
+        data = bytearray(self.archive.read_bytes())
+        data[data.index(bytes(range(256))) + 1000] ^= 0xFF
+        self.archive.write_bytes(data)
+        with self.assertRaisesRegex(zipfile.BadZipFile, "raw.bin"):
+            apply_mod._extract_archive(self.archive, self.root / "out")
+        with mock.patch.object(apply_mod.os, "copy_file_range", side_effect=OSError("unsupported"), create=True):
+            with self.assertRaisesRegex(zipfile.BadZipFile, "raw.bin"):
+                apply_mod._extract_archive(self.archive, self.root / "fallback")
+
+    def test_member_escaping_the_root_is_rejected(self) -> None:
+        evil = self.root / "evil.skill"
+        with zipfile.ZipFile(evil, "w") as zf:
+            zf.writestr("alpha/SKILL.md", "# alpha\n")
+            zf.writestr("alpha/../../escaped.txt", "x")
+        with self.assertRaisesRegex(RuntimeError, "unsafe archive member"):
+            apply_mod._extract_archive(evil, self.root / "out")
+        self.assertFalse((self.root / "escaped.txt").exists())
+        self.assertFalse((self.root / "out").exists())
+
+
+class UnchangedArchiveTest(FakeHomeTestCase):
+    def _apply(self) -> dict:
+        check_file = self.write_check_file([{"skill": "alpha", "strategy": "install-from-local-archive"}])
+        report = self.root / "report.json"
+        proc = self.run_script("apply_skill_updates.py", "--check-file", str(check_file), "--report", str(report))
+        self.assertIn(proc.returncode, (0, 1), proc.stderr)
+        result = self.read_report(report)["results"][0]
+        return {"status": result["status"], "reason": result["reason"]}
+
+    def test_applied_archive_is_not_extracted_again(self) -> None:
+        self.installed_skill("alpha", "alpha v1")
+        _write_archive(self.skills_root / "dist" / "alpha.skill", "alpha", "alpha v2")
+        self.assertEqual(self._apply(), {"status": "SUCCESS", "reason": "updated"})
+
+        # A file where the staging directory goes makes any extraction fail.
+        staging = self.skills_root / ".tmp"
+        staging.write_text("", encoding="utf-8")
+        self.assertEqual(self._apply(), {"status": "SKIPPED", "reason": "no_changes_detected"})
+        staging.unlink()
+
+        # A local edit to the installed tree invalidates the recorded fingerprint.
+        installed = self.skills_root / "alpha" / "SKILL.md"
+        time.sleep(0.05)
+        installed.write_text("# edited\n", encoding="utf-8")
+        self.assertEqual(self._apply(), {"status": "SUCCESS", "reason": "updated"})
+        self.assertEqual(installed.read_text(encoding="utf-8"), "# alpha v2\n")
+
+
+class UpstreamRefTest(FakeHomeTestCase):
+    def _apply(self) -> tuple[str, str]:
+        check_file = self.write_check_file([_github_row("alpha", "skills/alpha")])
+        report = self.root / "report.json"
+        proc = self.run_script("apply_skill_updates.py", "--check-file", str(check_file), "--report", str(report))
+        self.assertIn(proc.returncode, (0, 1), proc.stderr)
+        result = self.read_report(report)["results"][0]
+        return result["status"], result["reason"]
+
+    def test_unmoved_upstream_ref_skips_staging(self) -> None:
+        self.installed_skill("alpha", "alpha v1")
+        self.git_remote_skill("example/skills", "skills/alpha", "alpha v2")
+        self.remote_skill("example/skills", "skills/alpha", "alpha v2")
+        self.assertEqual(self._apply(), ("SUCCESS", "updated"))
+
+        # With the installer's source gone, only a skipped stage can still succeed.
+        staged_source = self.remote / "example" / "skills" / "skills" / "alpha"
+        staged_source.rename(staged_source.with_name("alpha.hidden"))
+        self.assertEqual(self._apply(), ("SKIPPED", "no_upstream_change"))
+
+        # A new upstream commit moves the ref, so the skill is staged again.
+        self.git_remote_skill("example/skills", "skills/alpha", "alpha v3")
+        self.remote_skill("example/skills", "skills/alpha", "alpha v3")
+        self.assertEqual(self._apply(), ("SUCCESS", "updated"))
+        self.assertEqual(self._apply(), ("SKIPPED", "no_upstream_change"))
+
+    def test_local_edit_is_restaged_even_when_the_ref_has_not_moved(self) -> None:
+        self.installed_skill("alpha", "alpha v1")
+        self.git_remote_skill("example/skills", "skills/alpha", "alpha v2")
+        self.remote_skill("example/skills", "skills/alpha", "alpha v2")
+        self.assertEqual(self._apply(), ("SUCCESS", "updated"))
+        time.sleep(0.05)
+        (self.skills_root / "alpha" / "SKILL.md").write_text("# local edit\n", encoding="utf-8")
+        self.assertEqual(self._apply(), ("SUCCESS", "updated"))
+        self.assertEqual((self.skills_root / "alpha" / "SKILL.md").read_text(encoding="utf-8"), "# alpha v2\n")
+
+    def test_unknown_upstream_ref_stages_as_usual(self) -> None:
+        # No local git repo for example/skills, so ls-remote fails and the ref stays unknown.
+        self.installed_skill("alpha", "alpha v1")
+        self.remote_skill("example/skills", "skills/alpha", "alpha v2")
+        self.assertEqual(self._apply(), ("SUCCESS", "updated"))
+        self.assertEqual(self._apply(), ("SKIPPED", "no_changes_detected"))
+
+
+class RepoCacheTest(FakeHomeTestCase):
+    def _apply(self, rows: list[dict[str, str]]) -> dict[str, dict]:
+        check_file = self.write_check_file(rows)
+        report = self.root / "report.json"
+        proc = self.run_script(
+            "apply_skill_updates.py", "--check-file", str(check_file), "--repo-cache", "--report", str(report)
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        return {r["skill"]: r for r in self.read_report(report)["results"]}
+
+    def test_skills_are_staged_from_one_shared_bare_clone(self) -> None:
+        rows = [_github_row(name, f"skills/{name}") for name in ("alpha", "beta")]
+        for name in ("alpha", "beta"):
+            self.installed_skill(name, f"{name} v1")
+            self.git_remote_skill("example/skills", f"skills/{name}", f"{name} v2")
+        # Nothing under FAKE_REMOTE: the installer would fail, so success means git staged it.
+        results = self._apply(rows)
+        for name in ("alpha", "beta"):
+            self.assertEqual(results[name]["status"], "SUCCESS")
+            self.assertTrue(any(" archive " in cmd for cmd in results[name]["commands"]))
+            self.assertIn(f"{name} v2", (self.skills_root / name / "SKILL.md").read_text(encoding="utf-8"))
+        self.assertEqual([p.name for p in (self.skills_root / ".cache" / "repos").glob("*.git")], ["example__skills.git"])
+
+        self.git_remote_skill("example/skills", "skills/alpha", "alpha v3")
+        results = self._apply(rows)
+        # The repo's ref moved, so beta is staged again from the updated cache and found unchanged.
+        self.assertEqual(results["alpha"]["status"], "SUCCESS")
+        self.assertEqual((results["beta"]["status"], results["beta"]["reason"]), ("SKIPPED", "no_changes_detected"))
+        self.assertIn("alpha v3", (self.skills_root / "alpha" / "SKILL.md").read_text(encoding="utf-8"))
+
+    def test_repo_unreachable_by_git_falls_back_to_the_installer(self) -> None:
+        self.installed_skill("alpha", "alpha v1")
+        self.remote_skill("example/skills", "skills/alpha", "alpha v2")
+        result = self._apply([_github_row("alpha", "skills/alpha")])["alpha"]
+        self.assertEqual((result["status"], result["reason"]), ("SUCCESS", "updated"))
+        self.assertFalse(any(" archive " in cmd for cmd in result["commands"]))
+
+
+def _tree_snapshot(root: Path) -> dict[str, tuple[bytes, int]]:
+    return {
+        str(path.relative_to(root)): (path.read_bytes(), path.stat().st_mode & 0o777)
+        for path in sorted(root.rglob("*"))
+        if path.is_file()
+    }
+
+
+class BackupRollbackTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        skills_root = self.root / "codex" / "skills"
+        for name, value in (
+            ("SKILLS_ROOT", skills_root),
+            ("SYSTEM_SKILLS_ROOT", skills_root / ".system"),
+            ("STAGING_ROOT", skills_root / ".tmp"),
+        ):
+            patcher = mock.patch.object(apply_mod, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        apply_mod._skill_dest.cache_clear()
+        self.addCleanup(apply_mod._skill_dest.cache_clear)
+        self.dest = write_skill(skills_root / "alpha", "alpha v1")
+        (self.dest / "run.sh").write_text("#!/bin/sh\n", encoding="utf-8")
+        (self.dest / "run.sh").chmod(0o755)
+        self.original = _tree_snapshot(self.dest)
+        self.backup_root = self.root / "backups" / "run"
+
+    def _apply(self, staged_body: str | None) -> apply_mod.UpdateResult:
+        # staged_body None stages a tree without SKILL.md, which fails post-update validation.
+        temp_root = Path(tempfile.mkdtemp(dir=self.root))
+        staged = write_skill(temp_root / "alpha", staged_body or "broken")
+        if staged_body is None:
+            (staged / "SKILL.md").unlink()
+        row = apply_mod.UpdateRow("alpha", "user", "OK", "update-via-github", "example/skills", "skills/alpha", "")
+        out = apply_mod.StageTaskResult(index=0, row=row, commands=[], temp_root=temp_root, staged=staged)
+        return apply_mod._apply_one(out, self.backup_root, no_backup=False)
+
+    def _stat_on_other_device(self, path: str | Path, *args: Any, **kwargs: Any) -> os.stat_result:
+        # Reports a different st_dev for the backup root only, as if it were another mount.
+        st = _REAL_STAT(path, *args, **kwargs)
+        if Path(path) == self.backup_root:
+            return os.stat_result((st.st_mode, st.st_ino, st.st_dev + 1, *tuple(st)[3:]))
+        return st
+
+    def test_cross_device_backup_is_one_tar_file_and_restores(self) -> None:
+        with mock.patch.object(apply_mod.os, "stat", side_effect=self._stat_on_other_device):
+            result = self._apply(None)
+        self.assertEqual((result.status, result.rollback), ("FAILED", "restored_from_backup"))
+        self.assertEqual(Path(result.backup_path), self.backup_root / "user__alpha.tar")
+        with tarfile.open(result.backup_path) as tar:
+            self.assertIn("alpha/SKILL.md", tar.getnames())
+        self.assertEqual(_tree_snapshot(self.dest), self.original)
+
+    def test_cross_device_success_keeps_the_tar_backup(self) -> None:
+        with mock.patch.object(apply_mod.os, "stat", side_effect=self._stat_on_other_device):
+            result = self._apply("alpha v2")
+        self.assertEqual((result.status, result.reason), ("SUCCESS", "updated"))
+        self.assertIn("alpha v2", (self.dest / "SKILL.md").read_text(encoding="utf-8"))
+        restored = self.root / "restored"
+        apply_mod._extract_backup_tar(Path(result.backup_path), restored)
+        self.assertEqual(_tree_snapshot(restored / "alpha"), self.original)
+
+    def test_same_device_backup_hardlinks_and_restores(self) -> None:
+        skill_md_inode = (self.dest / "SKILL.md").stat().st_ino
+        result = self._apply(None)
+        self.assertEqual((result.status, result.rollback), ("FAILED", "restored_from_backup"))
+        backup = Path(result.backup_path)
+        self.assertEqual(backup, self.backup_root / "user__alpha")
+        self.assertEqual((backup / "SKILL.md").stat().st_ino, skill_md_inode)
+        self.assertEqual(_tree_snapshot(self.dest), self.original)
+
+
+class RunStateTest(unittest.TestCase):
+    def test_memoized_state_is_reset_at_the_start_of_each_run(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        apply_mod._skill_dest("user", "alpha")
+        apply_mod._prepare_backup_root(Path(tmp.name) / "backups")
+        apply_mod._cached_tree_signature(Path(tmp.name))
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(apply_mod.main(["--check-file", "/nonexistent/check.ndjson"]), 2)
+        self.assertEqual(apply_mod._skill_dest.cache_info().currsize, 0)
+        self.assertEqual(apply_mod._prepare_backup_root.cache_info().currsize, 0)
+        self.assertEqual(apply_mod._TREE_SIGNATURE_CACHE, {})
+
+
+class ProcessExecutorCacheTest(FakeHomeTestCase):
+    def test_digests_hashed_in_worker_processes_are_saved(self) -> None:
+        rows = []
+        for name in ("alpha", "beta"):
+            self.remote_skill("example/skills", f"skills/{name}", name)
+            self.installed_skill(name, name)
+            rows.append(_github_row(name, f"skills/{name}"))
+        check_file = self.write_check_file(rows)
+        proc = self.run_script(
+            "apply_skill_updates.py", "--check-file", str(check_file), "--executor", "process", "--jobs", "2"
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        cache_dir = self.skills_root / ".cache"
+        file_digests = self.read_report(cache_dir / "fingerprints.json")
+        tree_digests = self.read_report(cache_dir / "tree_fingerprints.json")
+        for name in ("alpha", "beta"):
+            with self.subTest(skill=name):
+                self.assertIn(str(self.skills_root / name / "SKILL.md"), file_digests)
+                self.assertIn(str(self.skills_root / name / "sub" / "data.txt"), file_digests)
+                self.assertIn(str(self.skills_root / name), tree_digests)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import stat
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from support import FakeHomeTestCase, write_fake_gh
+
+import check_skill_updates as check_mod
+from skill_update_common import JsonCache
+
+
+class _TempRemoteCacheCase(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "remote_lookups.json"
+        self.cache = JsonCache(self.path)
+        patcher = mock.patch.object(check_mod, "_REMOTE_CACHE", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, self.cache, "_dirty", False)
+
+
+class RemoteCacheTest(_TempRemoteCacheCase):
+    def test_entries_older_than_the_ttl_are_pruned_before_saving(self) -> None:
+        self.cache.set("list:old", [time.time() - 601, ["a"]])
+        self.cache.set("probe:broken", "not-an-entry")
+        check_mod._remote_cache_put("list:new", ["b"], 600)
+        check_mod._prune_remote_cache(600)
+        self.cache.save()
+        self.assertEqual(list(json.loads(self.path.read_text(encoding="utf-8"))), ["list:new"])
+        self.assertEqual(check_mod._remote_cache_get("list:new", 600), ["b"])
+
+    def test_disabled_cache_is_left_alone(self) -> None:
+        self.cache.set("list:old", [time.time() - 601, ["a"]])
+        check_mod._prune_remote_cache(0)
+        self.assertIsNotNone(self.cache.get("list:old"))
+
+    def test_expired_entry_is_a_miss(self) -> None:
+        self.cache.set("list:old", [time.time() - 601, ["a"]])
+        self.assertIsNone(check_mod._remote_cache_get("list:old", 600))
+        self.assertEqual(check_mod._remote_cache_get("list:old", 3600), ["a"])
+
+
+class PrefetchProbesTest(_TempRemoteCacheCase):
+    CANDIDATES = [
+        [("example/skills", "skills/alpha", "github"), ("example/skills", "skills/missing", "github")],
+        [("example/skills", "skills/cached", "github")],
+    ]
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.queries: list[list[str]] = []
+        for patcher in (
+            mock.patch.object(check_mod, "_github_token", return_value="token"),
+            mock.patch.object(check_mod, "_query_skill_paths", side_effect=self._query),
+            mock.patch.dict(check_mod._BATCH_PROBES, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _query(self, repo: str, paths: list[str]) -> dict[str, bool]:
+        self.queries.append(paths)
+        return {path: path != "skills/missing" for path in paths}
+
+    def test_cached_probes_are_skipped_and_hits_written_back(self) -> None:
+        check_mod._remote_cache_put(check_mod._probe_cache_key("example/skills", "skills/cached"), True, 600)
+        check_mod._prefetch_probes(self.CANDIDATES, 600)
+        self.assertEqual(self.queries, [["skills/alpha", "skills/missing"]])
+        self.assertTrue(check_mod._remote_cache_get(check_mod._probe_cache_key("example/skills", "skills/alpha"), 600))
+        self.assertIsNone(check_mod._remote_cache_get(check_mod._probe_cache_key("example/skills", "skills/missing"), 600))
+
+        self.queries.clear()
+        check_mod._prefetch_probes([self.CANDIDATES[0][:1], self.CANDIDATES[1]], 600)
+        self.assertEqual(self.queries, [])
+
+    def test_disabled_cache_queries_everything(self) -> None:
+        check_mod._remote_cache_put(check_mod._probe_cache_key("example/skills", "skills/cached"), True, 600)
+        check_mod._prefetch_probes(self.CANDIDATES, 0)
+        self.assertEqual(self.queries, [["skills/alpha", "skills/missing", "skills/cached"]])
+
+
+class ProbeCandidatesTest(unittest.TestCase):
+    CANDIDATES = [
+        [("example/skills", "skills/missing", "github"), ("example/skills", "skills/alpha", "github")],
+        [("example/skills", "skills/alpha", "github")],
+        [("example/skills", "skills/beta", "github"), ("example/skills", "skills/never", "github")],
+    ]
+
+    def _probe(self, repo: str, path: str, cache_ttl: int) -> tuple[bool, str]:
+        self.probed.append(path)
+        return (path != "skills/missing", path)
+
+    def setUp(self) -> None:
+        self.probed: list[str] = []
+        patcher = mock.patch.object(check_mod, "_probe_install", side_effect=self._probe)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_single_job_probes_inline(self) -> None:
+        with mock.patch.object(check_mod, "ThreadPoolExecutor", side_effect=AssertionError("pool created")):
+            probes = check_mod._probe_candidates(self.CANDIDATES, 1, 0)
+        self.assertEqual(self.probed, ["skills/missing", "skills/alpha", "skills/beta"])
+        self.assertEqual(probes, check_mod._probe_candidates(self.CANDIDATES, 4, 0))
+
+
+class RunStateTest(unittest.TestCase):
+    def test_prefetched_probes_do_not_outlive_a_run(self) -> None:
+        check_mod._BATCH_PROBES[("example/skills", "skills/alpha")] = True
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            check_mod.main(["--no-such-option"])
+        self.assertEqual(check_mod._BATCH_PROBES, {})
+
+
+class GithubTokenTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = Path(tmp.name)
+        write_fake_gh(self.root / "bin")
+        self.gh_log = self.root / "gh.log"
+        self.cache_dir = self.root / "xdg-cache" / "codex-skill-updater"
+        env = {"PATH": f"{self.root / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}", "FAKE_GH_LOG": str(self.gh_log)}
+        for patcher in (
+            mock.patch.dict(os.environ, env),
+            mock.patch.object(check_mod, "GH_TOKEN_CACHE_DIR", self.cache_dir),
+            mock.patch.object(check_mod, "GH_TOKEN_CACHE", self.cache_dir / "gh-token"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for name in ("GH_TOKEN", "GITHUB_TOKEN"):
+            if name in os.environ:
+                self.addCleanup(os.environ.__setitem__, name, os.environ.pop(name))
+        check_mod._resolve_github_token.cache_clear()
+        self.addCleanup(check_mod._resolve_github_token.cache_clear)
+
+    def _gh_calls(self) -> list[str]:
+        return self.gh_log.read_text(encoding="utf-8").splitlines() if self.gh_log.exists() else []
+
+    def test_gh_token_is_cached_privately_outside_codex_home(self) -> None:
+        self.assertEqual(check_mod._github_token(), "fake-gh-token")
+        self.assertEqual(check_mod._github_token(), "fake-gh-token")
+        self.assertEqual(self._gh_calls(), ["auth token"])
+        self.assertEqual(stat.S_IMODE(self.cache_dir.stat().st_mode), 0o700)
+        self.assertEqual(stat.S_IMODE((self.cache_dir / "gh-token").stat().st_mode), 0o600)
+
+        check_mod._resolve_github_token.cache_clear()
+        self.assertEqual(check_mod._github_token(), "fake-gh-token")
+        self.assertEqual(self._gh_calls(), ["auth token"])
+
+    def test_env_token_wins_without_running_gh(self) -> None:
+        with mock.patch.dict(os.environ, {"GITHUB_TOKEN": "env-token"}):
+            self.assertEqual(check_mod._github_token(), "env-token")
+        self.assertEqual(self._gh_calls(), [])
+        self.assertFalse(self.cache_dir.exists())
+
+
+class EtagCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = JsonCache(Path(tmp.name) / "github_etags.json")
+        self.requests: list[str | None] = []
+        self.responses: list[tuple[int, bytes, str | None]] = []
+        for patcher in (
+            mock.patch.object(check_mod, "_ETAG_CACHE", self.cache),
+            mock.patch.object(check_mod, "_github_api_request", side_effect=self._request),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, self.cache, "_dirty", False)
+        check_mod._GITHUB_API_DOWN.clear()
+
+    def _request(self, method: str, path: str, body: bytes | None = None, etag: str | None = None):
+        self.requests.append(etag)
+        return self.responses.pop(0)
+
+    def test_not_modified_response_reuses_the_cached_result(self) -> None:
+        listing = json.dumps([{"name": "SKILL.md", "type": "file"}]).encode("utf-8")
+        self.responses = [(200, listing, '"v1"'), (304, b"", '"v1"')]
+        self.assertEqual(check_mod._probe_contents_api("example/skills", "skills/alpha"), (True, "ok"))
+        self.assertEqual(check_mod._probe_contents_api("example/skills", "skills/alpha"), (True, "ok"))
+        self.assertEqual(self.requests, [None, '"v1"'])
+
+    def test_inconclusive_response_is_not_cached(self) -> None:
+        self.responses = [(403, b"rate limited", None), (403, b"rate limited", None)]
+        self.assertIsNone(check_mod._probe_contents_api("example/skills", "skills/alpha"))
+        self.assertIsNone(check_mod._probe_contents_api("example/skills", "skills/alpha"))
+        self.assertEqual(self.requests, [None, None])
+
+    def test_unused_and_old_format_entries_are_pruned_before_saving(self) -> None:
+        listing = json.dumps([{"name": "SKILL.md", "type": "file"}]).encode("utf-8")
+        self.responses = [(200, listing, '"v1"')]
+        check_mod._probe_contents_api("example/skills", "skills/alpha")
+        stale = time.time() - check_mod.ETAG_CACHE_MAX_AGE - 1
+        self.cache.set("example/skills@main:skills/gone", [stale, '"v0"', True, "ok"])
+        self.cache.set("example/skills@main:skills/legacy", ['"v0"', True, "ok"])
+        check_mod._prune_etag_cache()
+        self.cache.save()
+        saved = json.loads(self.cache.path.read_text(encoding="utf-8"))
+        self.assertEqual(list(saved), [f"example/skills@{check_mod.DEFAULT_REF}:skills/alpha"])
+
+
+class RemoteListingTest(FakeHomeTestCase):
+    def test_listing_failures_are_reported_once_in_source_order(self) -> None:
+        self.installed_skill("alpha", "alpha")
+        proc = self.run_script(
+            "check_skill_updates.py",
+            FAKE_LIST_FAIL="openai/skills:skills/.curated,anthropics/skills:skills",
+            # The first source finishes last, after the other failure has already been raised.
+            FAKE_LIST_DELAY="openai/skills:skills/.curated=0.5",
+        )
+        self.assertEqual(proc.returncode, 1)
+        self.assertEqual(proc.stdout, "")
+        self.assertEqual(
+            proc.stderr.splitlines(),
+            [
+                "openai/skills:skills/.curated: Error: cannot list openai/skills:skills/.curated",
+                "anthropics/skills:skills: Error: cannot list anthropics/skills:skills",
+                "failed to load remote skills: openai/skills:skills/.curated, anthropics/skills:skills",
+            ],
+        )
+
+    def test_cached_listings_and_probes_are_reused_within_the_ttl(self) -> None:
+        self.installed_skill("alpha", "alpha")
+        self.remote_skill("anthropics/skills", "skills/alpha", "alpha")
+        first = self.run_script("check_skill_updates.py")
+        self.assertEqual(first.returncode, 0, first.stderr)
+
+        # Every listing now fails and the probe source is gone: only the cache can answer.
+        failing = ",".join(f"{repo}:{path}" for repo, path in check_mod.REMOTE_SET_SOURCES)
+        (self.remote / "anthropics" / "skills" / "skills" / "alpha" / "SKILL.md").unlink()
+        cached = self.run_script("check_skill_updates.py", FAKE_LIST_FAIL=failing)
+        self.assertEqual((cached.returncode, cached.stdout), (0, first.stdout), cached.stderr)
+
+        uncached = self.run_script("check_skill_updates.py", "--remote-cache-ttl", "0", FAKE_LIST_FAIL=failing)
+        self.assertEqual(uncached.returncode, 1)
+        self.assertIn("failed to load remote skills", uncached.stderr)
+
+    def test_listings_resolve_skills_without_metadata(self) -> None:
+        self.installed_skill("alpha", "alpha")
+        self.remote_skill("anthropics/skills", "skills/alpha", "alpha")
+        proc = self.run_script("check_skill_updates.py")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        row = json.loads(proc.stdout.splitlines()[0])
+        self.assertEqual((row["skill"], row["repo"], row["remote_path"]), ("alpha", "anthropics/skills", "skills/alpha"))
+
+    def test_unhashable_meta_source_falls_back_to_the_listings(self) -> None:
+        alpha = self.installed_skill("alpha", "alpha")
+        self.remote_skill("anthropics/skills", "skills/alpha", "alpha")
+        for source in (["github"], {"kind": "github"}):
+            with self.subTest(source=source):
+                (alpha / ".skill-meta.json").write_text(json.dumps({"source": source}), encoding="utf-8")
+                proc = self.run_script("check_skill_updates.py")
+                self.assertEqual(proc.returncode, 0, proc.stderr)
+                row = json.loads(proc.stdout.splitlines()[0])
+                self.assertEqual((row["repo"], row["remote_path"]), ("anthropics/skills", "skills/alpha"))
+
+
+class DistArchiveTest(FakeHomeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.alpha = self.installed_skill("alpha", "alpha")
+        self.remote_skill("example/skills", "skills/alpha", "alpha")
+        self.archive = self.skills_root / "dist" / "alpha.skill"
+        self.archive.parent.mkdir()
+        self.archive.write_bytes(b"archive")
+
+    def _strategy(self, archive_age: float) -> str:
+        installed = self.alpha.stat().st_mtime
+        os.utime(self.archive, (installed + archive_age, installed + archive_age))
+        proc = self.run_script("check_skill_updates.py")
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        return json.loads(proc.stdout.splitlines()[0])["strategy"]
+
+    def _track_on_github(self) -> None:
+        meta = {"source": "github", "repo": "example/skills", "skillPath": "skills/alpha"}
+        (self.alpha / ".skill-meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        os.utime(self.alpha / ".skill-meta.json", (self.alpha.stat().st_mtime,) * 2)
+
+    def test_stale_archive_does_not_shadow_a_github_source(self) -> None:
+        self._track_on_github()
+        self.assertEqual(self._strategy(-60), "update-via-github")
+
+    def test_current_archive_skips_the_github_probe(self) -> None:
+        self._track_on_github()
+        self.assertEqual(self._strategy(60), "install-from-local-archive")
+
+    def test_any_archive_wins_for_untracked_skills(self) -> None:
+        self.assertEqual(self._strategy(-60), "install-from-local-archive")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import support  # noqa: F401  (puts scripts/ on sys.path)
+
+import apply_skill_updates
+import check_skill_updates
+import skill_update_common
+from skill_update_common import JsonCache, capture_thread_output, run_script
+
+
+class SharedHelpersTest(unittest.TestCase):
+    def test_both_scripts_use_the_shared_helpers(self) -> None:
+        for module in (apply_skill_updates, check_skill_updates):
+            with self.subTest(module=module.__name__):
+                self.assertIs(module.JsonCache, JsonCache)
+                self.assertIs(module.run_script, run_script)
+
+
+class JsonCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "cache" / "entries.json"
+
+    def test_save_round_trips_and_applies_keep(self) -> None:
+        cache = JsonCache(self.path, keep=lambda key: key != "drop")
+        cache.set("keep", [1, "a"])
+        cache.set("drop", 2)
+        cache.save()
+        self.assertEqual(json.loads(self.path.read_text(encoding="utf-8")), {"keep": [1, "a"]})
+        self.assertEqual(JsonCache(self.path).get("keep"), [1, "a"])
+
+    def test_unreadable_file_loads_as_empty(self) -> None:
+        self.path.parent.mkdir(parents=True)
+        self.path.write_text("[1, 2", encoding="utf-8")
+        cache = JsonCache(self.path)
+        self.assertIsNone(cache.get("anything"))
+        cache.save()
+        self.assertEqual(self.path.read_text(encoding="utf-8"), "[1, 2")
+
+    def test_prune_drops_rejected_entries_on_save(self) -> None:
+        cache = JsonCache(self.path)
+        cache.set("old", 1)
+        cache.set("new", 2)
+        cache.save()
+        cache = JsonCache(self.path)
+        cache.prune(lambda _key, value: value > 1)
+        cache.save()
+        self.assertEqual(json.loads(self.path.read_text(encoding="utf-8")), {"new": 2})
+
+    def test_tracked_changes_are_handed_over_once(self) -> None:
+        cache = JsonCache(self.path)
+        cache.set("before", 0)
+        self.assertEqual(cache.take_changes(), {})
+        cache.track_changes()
+        cache.set("a", 1)
+        self.assertEqual(cache.take_changes(), {"a": 1})
+        self.assertEqual(cache.take_changes(), {})
+        other = JsonCache(self.path)
+        other.update({"a": 1})
+        other.save()
+        self.assertEqual(json.loads(self.path.read_text(encoding="utf-8")), {"a": 1})
+
+
+class CaptureThreadOutputTest(unittest.TestCase):
+    def test_each_thread_captures_only_its_own_output(self) -> None:
+        captured: dict[int, tuple[str, str]] = {}
+        barrier = threading.Barrier(4)
+
+        def worker(index: int) -> None:
+            with capture_thread_output() as (out, err):
+                barrier.wait()
+                print(f"out {index}")
+                print(f"err {index}", file=sys.stderr)
+                barrier.wait()
+            captured[index] = (out.getvalue(), err.getvalue())
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(captured, {i: (f"out {i}\n", f"err {i}\n") for i in range(4)})
+
+
+SCRIPT_WITH_MAIN = """\
+import sys
+
+
+def main(argv):
+    print("out " + " ".join(argv))
+    print("err", file=sys.stderr)
+    return 3
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
+"""
+
+
+class RunScriptTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.script = Path(tmp.name) / "tool-script.py"
+        self.script.write_text(SCRIPT_WITH_MAIN, encoding="utf-8")
+        skill_update_common.load_script_main.cache_clear()
+        self.addCleanup(skill_update_common.load_script_main.cache_clear)
+
+    def test_in_process_and_subprocess_runs_agree(self) -> None:
+        in_process = run_script(self.script, ["a", "b"])
+        self.assertIsNotNone(skill_update_common.load_script_main(self.script))
+        skill_update_common.load_script_main.cache_clear()
+        with mock.patch.dict(os.environ, {skill_update_common.SUBPROCESS_ENV: "1"}):
+            subprocess_run = run_script(self.script, ["a", "b"])
+            self.assertIsNone(skill_update_common.load_script_main(self.script))
+        self.assertEqual(in_process, (3, "out a b\n", "err\n"))
+        self.assertEqual(subprocess_run, in_process)
+
+    def test_subprocess_stdout_can_be_discarded(self) -> None:
+        with mock.patch.dict(os.environ, {skill_update_common.SUBPROCESS_ENV: "1"}):
+            self.assertEqual(run_script(self.script, [], capture_stdout=False), (3, "", "err\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
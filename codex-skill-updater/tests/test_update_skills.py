@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import unittest
+import zipfile
+
+from support import FakeHomeTestCase, write_fake_gh
+
+
+class GithubTokenTest(FakeHomeTestCase):
+    def test_gh_is_not_run_when_nothing_needs_the_github_api(self) -> None:
+        # Listed nowhere, so check has no GitHub candidate to probe.
+        self.installed_skill("alpha", "alpha")
+        write_fake_gh(self.root / "bin")
+        gh_log = self.root / "gh.log"
+        for extra in ((), ("--legacy-subprocess",)):
+            with self.subTest(argv=extra):
+                proc = self.run_script(
+                    "update_skills.py",
+                    "--dry-run",
+                    *extra,
+                    PATH=f"{self.root / 'bin'}:{self.env()['PATH']}",
+                    FAKE_GH_LOG=str(gh_log),
+                )
+                self.assertEqual(proc.returncode, 0, proc.stderr)
+                self.assertFalse(gh_log.exists())
+                self.assertFalse((self.root / "xdg-cache").exists())
+
+
+class InProcessParityTest(FakeHomeTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        # One skill per strategy: GitHub metadata, a local dist archive, and nothing to resolve it with.
+        self._install_v1()
+        self.remote_skill("example/skills", "skills/alpha", "alpha v2")
+        (self.skills_root / "dist").mkdir()
+        with zipfile.ZipFile(self.skills_root / "dist" / "beta.skill", "w") as zf:
+            zf.writestr("beta/SKILL.md", "# beta v2\n")
+        self.installed_skill("gamma", "gamma v1")
+
+    def _install_v1(self) -> None:
+        alpha = self.installed_skill("alpha", "alpha v1")
+        meta = {"source": "github", "repo": "example/skills", "skillPath": "skills/alpha"}
+        (alpha / ".skill-meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        self.installed_skill("beta", "beta v1")
+
+    def _run(self, *argv: str) -> tuple[int, str, str, list[dict]]:
+        proc = self.run_script("update_skills.py", "--debug-artifacts", *argv)
+        check_output = (self.root / "skill_update_check.debug.ndjson").read_text(encoding="utf-8")
+        report = self.read_report(self.root / "skill_update_apply_report.debug.json")
+        # commands name per-run staging directories, so only the outcome of each row is compared.
+        results = [{key: r[key] for key in ("skill", "strategy", "status", "reason")} for r in report["results"]]
+        return proc.returncode, proc.stdout, check_output, results
+
+    def test_legacy_subprocess_matches_in_process(self) -> None:
+        in_process = self._run("--dry-run")
+        legacy = self._run("--dry-run", "--legacy-subprocess")
+        self.assertEqual(legacy, in_process)
+        code, _, _, results = in_process
+        self.assertEqual(code, 0)
+        self.assertEqual(
+            {r["skill"]: r["status"] for r in results}, {"alpha": "DRY_RUN", "beta": "DRY_RUN", "gamma": "SKIPPED"}
+        )
+
+    def test_both_modes_apply_the_same_updates(self) -> None:
+        for argv in ((), ("--legacy-subprocess",)):
+            with self.subTest(argv=argv):
+                self._install_v1()
+                code, _, _, results = self._run(*argv)
+                self.assertEqual(code, 0)
+                self.assertEqual(
+                    {r["skill"]: (r["status"], r["reason"]) for r in results},
+                    {
+                        "alpha": ("SUCCESS", "updated"),
+                        "beta": ("SUCCESS", "updated"),
+                        "gamma": ("SKIPPED", "manual_source_map_not_enabled"),
+                    },
+                )
+                for name in ("alpha", "beta"):
+                    self.assertIn(f"{name} v2", (self.skills_root / name / "SKILL.md").read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()